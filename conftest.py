@@ -0,0 +1,46 @@
+"""
+Shared pytest fixtures for the script tests.
+"""
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "integration: needs network access to YouTube")
+
+
+# Canonical importable name for get_yt-video-by-id.py. The file is loaded by path
+# (SourceFileLoader), which still caches bytecode as
+# __pycache__/get_yt-video-by-id.cpython-*.pyc, so no renamed copy is needed.
+MODULE_NAME = "get_yt_video_by_id"
+_MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+_SCRIPT_PATH = os.path.join(_MODULE_DIR, "get_yt-video-by-id.py")
+CLAUDE45_MODULE_NAME = "get_ibm_yt_dlt_claude45"
+_CLAUDE45_PATH = os.path.join(_MODULE_DIR, "get_ibm_yt-dlt_claude45_20251006.py")
+
+
+def _load_script(name, path):
+    """Load a hyphenated script under an importable name, once per interpreter."""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.spec_from_file_location(name, path)
+    mod = importlib.util.module_from_spec(spec)
+    sys.modules[name] = mod
+    spec.loader.exec_module(mod)
+    return mod
+
+
+@pytest.fixture(scope="session")
+def yt_video():
+    """get_yt-video-by-id.py (hyphenated, so not importable by name), loaded once per session."""
+    return _load_script(MODULE_NAME, _SCRIPT_PATH)
+
+
+@pytest.fixture(scope="session")
+def ibm_claude45():
+    """get_ibm_yt-dlt_claude45_20251006.py, loaded once per session."""
+    return _load_script(CLAUDE45_MODULE_NAME, _CLAUDE45_PATH)
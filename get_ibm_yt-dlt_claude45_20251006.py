@@ -16,6 +16,18 @@ from pathlib import Path
 from typing import Dict, List, Optional, Any
 import subprocess
 import argparse
+import copy
+import itertools
+import hashlib
+import random
+import re
+import shutil
+import time
+import traceback
+import urllib.request
+from types import MappingProxyType
+from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     import yt_dlp
@@ -23,6 +35,56 @@ except ImportError:
     print("Error: yt-dlp not installed. Run: pip install yt-dlp")
     sys.exit(1)
 
+# orjson is optional: much faster report serialization when installed
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    HAS_REQUESTS = True
+except ImportError:
+    HAS_REQUESTS = False
+
+
+# Download error classification: the first matching pattern decides what the format loop does.
+#   CONTINUE      - selector-specific failure, try the next option immediately
+#   ABORT         - no other selector can succeed (no formats, DRM, geo-block)
+#   RETRY_BACKOFF - transient server/network failure, pause before the next option
+ERROR_ACTIONS = (
+    (re.compile(r'Requested format is not available'), 'CONTINUE'),
+    (re.compile(r'No video formats found'), 'ABORT'),
+    (re.compile(r'\bDRM\b|geo[- ]?restrict|not available in your country', re.IGNORECASE), 'ABORT'),
+    (re.compile(r'HTTP Error (?:403|429|5\d\d)|timed out'), 'RETRY_BACKOFF'),
+)
+BACKOFF_CAP_SECONDS = 30
+AUTO_CONCURRENCY_CAP = 32  # upper bound for probe-tuned concurrent_fragments
+DEFAULT_URL = 'https://video.ibm.com/recorded/134516112'
+
+
+def classify_download_error(message: str) -> str:
+    """Map a download error message to a format-loop action."""
+    for pattern, action in ERROR_ACTIONS:
+        if pattern.search(message):
+            return action
+    return 'CONTINUE'
+
+
+def normalize_report(obj: Any) -> Any:
+    """Convert a report tree to JSON-native types in a single walk."""
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    if isinstance(obj, dict):
+        return {str(k): normalize_report(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return [normalize_report(v) for v in obj]
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    return str(obj)
+
 
 class VideoDownloader:
     """Advanced video downloader with comprehensive logging and progress tracking."""
@@ -32,11 +94,18 @@ class VideoDownloader:
         self.config = config or self.get_default_config()
         self.debug_level = debug_level.lower()
         self.config['debug_level'] = self.debug_level
+        # Guard for hot paths: skip building debug messages entirely when output is off
+        self._dbg_enabled = self.debug_level != 'none'
+        if not self._dbg_enabled:
+            self.debug_print = lambda message, level='info': None
         self.setup_logging()
         self.progress_data = {}
         self.diagnostic_data = {}
         self.force_audio_combination = False
         self.optimal_format_found = None  # Store the format that diagnostics confirms works
+        self._info_cache: Dict[str, Dict[str, Any]] = {}  # extract_info results keyed by URL
+        self._diag_cache: Dict[str, Dict[str, Any]] = {}  # diagnostics results keyed by URL
+        self._http = None  # pooled requests.Session for probe HTTP, created on first use
         
     def get_default_config(self) -> Dict[str, Any]:
         """Get default configuration with popular settings."""
@@ -50,18 +119,24 @@ class VideoDownloader:
             'video_quality': 'best',
             'audio_quality': 'best',
             
-            # Download preferences
+            # Download preferences (subtitles/thumbnails are opt-in: each costs extra requests)
             'prefer_free_formats': True,
-            'extract_subtitles': True,
-            'auto_subtitles': True,
+            'extract_subtitles': False,
+            'auto_subtitles': False,
             'embed_subtitles': False,
-            'download_thumbnail': True,
+            'download_thumbnail': False,
             'embed_thumbnail': False,
             
             # Network settings
             'retries': 3,
             'fragment_retries': 5,
             'concurrent_fragments': 4,
+            'auto_concurrency': False,  # Probe HLS fragments to pick concurrent_fragments
+            'external_downloader': None,  # None = aria2c for HLS when installed, else native
+            
+            # On-disk caches (seconds; 0 disables)
+            'diagnostics_cache_ttl': 3600,
+            'info_cache_ttl': 600,
             
             # Post-processing
             'merge_output_format': 'mp4',
@@ -147,8 +222,205 @@ class VideoDownloader:
         elif level == 'progress':
             self.logger.info(f"{emoji} PROGRESS: {message}")
 
-    def run_diagnostic_tests(self, url: str) -> Dict[str, Any]:
+    def run_diagnostic_tests(self, url: str, use_cache: bool = True) -> Dict[str, Any]:
         """Run incremental diagnostic tests to isolate issues."""
+        diagnostics = None
+        if use_cache:
+            diagnostics = self._diag_cache.get(url) or self._load_cached_diagnostics(url)
+        if diagnostics is None:
+            diagnostics = self._diagnose(url)
+            self._store_cached_diagnostics(url, diagnostics)
+        self._diag_cache[url] = diagnostics
+        
+        # Store diagnostics
+        self.diagnostic_data = diagnostics
+        
+        # Store the optimal format if found
+        if diagnostics.get('tested_working_format'):
+            self.optimal_format_found = diagnostics['tested_working_format']
+        
+        return diagnostics
+    
+    def run_diagnostic_tests_batch(self, urls: List[str], max_workers: int = 8) -> Dict[str, Dict[str, Any]]:
+        """Run diagnostics for several URLs concurrently, keyed by URL.
+        
+        Each worker builds its own YoutubeDL instances, and results are returned
+        per URL instead of being written to instance state. Duplicate URLs are
+        diagnosed once, since _diagnose is only thread-safe across distinct URLs.
+        """
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return {}
+        workers = max(1, min(max_workers, len(urls)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return dict(zip(urls, executor.map(self._diagnose, urls)))
+    
+    def _extract_info(self, url: str) -> Dict[str, Any]:
+        """Extract video metadata once per URL and reuse it for the rest of the session.
+        
+        Results are also kept on disk for info_cache_ttl seconds so repeated runs
+        against the same URL skip the extractor round-trips.
+        """
+        if url in self._info_cache:
+            return self._info_cache[url]
+        ttl = self.config.get('info_cache_ttl', 0)
+        cache_path = self._info_cache_path(url)
+        info = self._read_json_cache(cache_path, ttl)
+        if info is not None:
+            self.debug_print(f"Using cached video info: {cache_path}", 'debug')
+        else:
+            with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}) as ydl:
+                info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+            if ttl:
+                self._write_json_cache(cache_path, info)
+        self._info_cache[url] = info
+        return info
+    
+    def _http_session(self):
+        """Shared keep-alive session so repeated probes to one CDN skip TCP/TLS setup."""
+        if self._http is None:
+            self._http = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=16)
+            self._http.mount('http://', adapter)
+            self._http.mount('https://', adapter)
+        return self._http
+    
+    def close(self):
+        """Close the pooled probe HTTP session, if one was opened."""
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+    
+    def _fetch_text(self, url: str, headers: Dict[str, str], timeout: float = 15) -> str:
+        """GET a small text resource (e.g. an m3u8 playlist)."""
+        if HAS_REQUESTS:
+            response = self._http_session().get(url, headers=headers, timeout=timeout)
+            response.raise_for_status()
+            return response.text
+        request = urllib.request.Request(url, headers=headers)
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.read().decode('utf-8', 'replace')
+    
+    def _fetch_bytes(self, url: str, headers: Dict[str, str], timeout: float = 15) -> int:
+        """Download a URL fully and return the number of bytes received."""
+        total = 0
+        if HAS_REQUESTS:
+            with self._http_session().get(url, headers=headers, timeout=timeout, stream=True) as response:
+                response.raise_for_status()
+                for chunk in response.iter_content(65536):
+                    total += len(chunk)
+            return total
+        request = urllib.request.Request(url, headers=headers)
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            while True:
+                chunk = response.read(65536)
+                if not chunk:
+                    return total
+                total += len(chunk)
+    
+    def probe_concurrency(self, url: str, format_id: Optional[str] = None, sample: int = 4) -> int:
+        """Pick concurrent_fragments by comparing one-fragment vs parallel-fragment throughput.
+        
+        Downloads one HLS fragment sequentially, then `sample` fragments in parallel.
+        Near-linear scaling means the server throttles per stream, so more parallel
+        fragments pay off (capped at AUTO_CONCURRENCY_CAP); otherwise the bandwidth
+        is already saturated and the default of 4 is kept. The result is stored in config['concurrent_fragments'].
+        """
+        default = 4
+        try:
+            info = self._extract_info(url)
+            formats = [f for f in info.get('formats', []) if (f.get('protocol') or '').startswith('m3u8')]
+            fmt = next((f for f in formats if f.get('format_id') == format_id), None) or \
+                max(formats, key=lambda f: f.get('height') or 0, default=None)
+            if not fmt:
+                return self.config['concurrent_fragments']
+            
+            headers = fmt.get('http_headers') or {}
+            playlist_url = fmt['url']
+            playlist = self._fetch_text(playlist_url, headers)
+            fragments = [urljoin(playlist_url, line.strip()) for line in playlist.splitlines()
+                         if line.strip() and not line.startswith('#')]
+            if len(fragments) < sample + 1:
+                return self.config['concurrent_fragments']
+            
+            start = time.monotonic()
+            single_rate = self._fetch_bytes(fragments[0], headers) / max(time.monotonic() - start, 1e-6)
+            
+            start = time.monotonic()
+            with ThreadPoolExecutor(max_workers=sample) as executor:
+                received = sum(executor.map(lambda u: self._fetch_bytes(u, headers), fragments[1:sample + 1]))
+            parallel_rate = received / max(time.monotonic() - start, 1e-6)
+            
+            speedup = parallel_rate / single_rate if single_rate else 1.0
+            # Marginal gain per extra stream above 85% -> per-stream throttling
+            if speedup >= sample * 0.85:
+                tuned = min(max(8, (os.cpu_count() or 1) * 2), AUTO_CONCURRENCY_CAP)
+            else:
+                tuned = default
+            self.debug_print(f"Concurrency probe: single={self._format_bytes(single_rate)}/s, "
+                             f"x{sample}={self._format_bytes(parallel_rate)}/s (speedup {speedup:.2f}) "
+                             f"-> concurrent_fragments={tuned}", 'info')
+        except Exception as e:
+            self.debug_print(f"Concurrency probe failed, keeping {self.config['concurrent_fragments']}: {str(e)}", 'warning')
+            return self.config['concurrent_fragments']
+        
+        self.config['concurrent_fragments'] = tuned
+        return tuned
+    
+    def _read_json_cache(self, cache_path: Path, ttl: float) -> Optional[Any]:
+        """Return the JSON payload at cache_path if it is younger than ttl seconds."""
+        if not ttl:
+            return None
+        try:
+            if time.time() - cache_path.stat().st_mtime >= ttl:
+                return None
+            with open(cache_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _write_json_cache(self, cache_path: Path, data: Any):
+        """Persist a JSON payload for _read_json_cache."""
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(cache_path, 'w') as f:
+                json.dump(data, f, default=str)
+        except OSError as e:
+            self.debug_print(f"Could not write cache {cache_path}: {str(e)}", 'warning')
+    
+    def _info_cache_path(self, url: str) -> Path:
+        """Cache file for a URL's extract_info result."""
+        digest = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return Path(self.config['output_dir']) / '.cache' / f'info_{digest}.json'
+    
+    def _diagnostics_cache_path(self, url: str) -> Path:
+        """Content-addressed cache file for a URL's diagnostics."""
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return Path(self.config['output_dir']) / '.diag_cache' / f'{digest}.json'
+    
+    def _load_cached_diagnostics(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return cached diagnostics for a URL if still within the TTL."""
+        cache_path = self._diagnostics_cache_path(url)
+        diagnostics = self._read_json_cache(cache_path, self.config.get('diagnostics_cache_ttl', 0))
+        if diagnostics is not None:
+            self.debug_print(f"Using cached diagnostics: {cache_path}", 'info')
+        return diagnostics
+    
+    def _store_cached_diagnostics(self, url: str, diagnostics: Dict[str, Any]):
+        """Persist diagnostics for a URL; failed runs are not cached."""
+        if not self.config.get('diagnostics_cache_ttl') or not diagnostics.get('format_detection'):
+            return
+        self._write_json_cache(self._diagnostics_cache_path(url), diagnostics)
+    
+    def _diagnose(self, url: str) -> Dict[str, Any]:
+        """Diagnostic test body; returns the results instead of storing them on the instance.
+        
+        Not side-effect free: via _extract_info it fills self._info_cache[url] and
+        writes the URL's info cache file (when info_cache_ttl is set), and it logs
+        through the shared logger. The diagnostics cache is written by
+        run_diagnostic_tests, not here. Both writes are keyed by URL, so concurrent
+        calls are safe for distinct URLs.
+        """
         self.debug_print("=" * 70, 'info')
         self.debug_print("STARTING COMPREHENSIVE DIAGNOSTIC TESTS", 'info')
         self.debug_print("=" * 70, 'info')
@@ -172,16 +444,14 @@ class VideoDownloader:
             self.debug_print("", 'info')
             self.debug_print("TEST 1: Checking URL accessibility", 'info')
             self.debug_print("-" * 70, 'info')
-            ydl_opts_basic = {'quiet': True, 'no_warnings': True}
-            with yt_dlp.YoutubeDL(ydl_opts_basic) as ydl:
-                try:
-                    info = ydl.extract_info(url, download=False)
-                    diagnostics['url_accessible'] = True
-                    self.debug_print("URL is accessible and can be parsed", 'success')
-                except Exception as e:
-                    diagnostics['issues_found'].append(f"URL not accessible: {str(e)}")
-                    self.debug_print(f"URL not accessible: {str(e)}", 'error')
-                    return diagnostics
+            try:
+                info = self._extract_info(url)
+                diagnostics['url_accessible'] = True
+                self.debug_print("URL is accessible and can be parsed", 'success')
+            except Exception as e:
+                diagnostics['issues_found'].append(f"URL not accessible: {str(e)}")
+                self.debug_print(f"URL not accessible: {str(e)}", 'error')
+                return diagnostics
             
             # Test 2: Metadata extraction
             self.debug_print("", 'info')
@@ -246,6 +516,8 @@ class VideoDownloader:
                             combined_formats.append(format_info)
                 
                 diagnostics['available_formats'] = format_details
+                diagnostics['video_only_formats'] = video_only_formats
+                diagnostics['audio_only_formats'] = audio_only_formats
                 diagnostics['video_only_count'] = len(video_only_formats)
                 diagnostics['audio_only_count'] = len(audio_only_formats)
                 diagnostics['combined_count'] = len(combined_formats)
@@ -372,13 +644,6 @@ class VideoDownloader:
                 self.debug_print(f"  - {issue}", 'warning')
         self.debug_print("=" * 70, 'info')
         
-        # Store diagnostics
-        self.diagnostic_data = diagnostics
-        
-        # Store the optimal format if found
-        if diagnostics.get('tested_working_format'):
-            self.optimal_format_found = diagnostics['tested_working_format']
-        
         return diagnostics
     
     def progress_hook(self, d: Dict[str, Any]):
@@ -429,43 +694,36 @@ class VideoDownloader:
         """List all available formats for the video."""
         self.logger.info(f"Listing available formats for: {url}")
         
-        ydl_opts = {
-            'quiet': not self.config['verbose'],
-            'no_warnings': False,
-            'extract_flat': False,
-        }
-        
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                formats = info.get('formats', [])
-                
-                self.logger.info(f"Total available formats: {len(formats)}")
-                print(f"\n{'='*80}")
-                print("AVAILABLE FORMATS:")
-                print(f"{'='*80}")
-                
-                for i, fmt in enumerate(formats):
-                    format_id = fmt.get('format_id', 'N/A')
-                    ext = fmt.get('ext', 'N/A')
-                    height = fmt.get('height', 'N/A')
-                    width = fmt.get('width', 'N/A')
-                    filesize = fmt.get('filesize', 'N/A')
-                    tbr = fmt.get('tbr', 'N/A')
-                    vcodec = fmt.get('vcodec', 'N/A')
-                    acodec = fmt.get('acodec', 'N/A')
-                    
-                    print(f"{i+1:2d}. Format ID: {format_id}")
-                    print(f"    Extension: {ext}")
-                    print(f"    Resolution: {width}x{height}" if width != 'N/A' and height != 'N/A' else f"    Height: {height}p" if height != 'N/A' else "    Resolution: N/A")
-                    print(f"    Bitrate: {tbr} kbps" if tbr != 'N/A' else "    Bitrate: N/A")
-                    print(f"    Video Codec: {vcodec}")
-                    print(f"    Audio Codec: {acodec}")
-                    print(f"    File Size: {self._format_bytes(filesize) if filesize != 'N/A' else 'N/A'}")
-                    print()
-                
-                return formats
+            info = self._extract_info(url)
+            formats = info.get('formats', [])
+            
+            self.logger.info(f"Total available formats: {len(formats)}")
+            print(f"\n{'='*80}")
+            print("AVAILABLE FORMATS:")
+            print(f"{'='*80}")
+            
+            for i, fmt in enumerate(formats):
+                format_id = fmt.get('format_id', 'N/A')
+                ext = fmt.get('ext', 'N/A')
+                height = fmt.get('height', 'N/A')
+                width = fmt.get('width', 'N/A')
+                filesize = fmt.get('filesize', 'N/A')
+                tbr = fmt.get('tbr', 'N/A')
+                vcodec = fmt.get('vcodec', 'N/A')
+                acodec = fmt.get('acodec', 'N/A')
                 
+                print(f"{i+1:2d}. Format ID: {format_id}")
+                print(f"    Extension: {ext}")
+                print(f"    Resolution: {width}x{height}" if width != 'N/A' and height != 'N/A' else f"    Height: {height}p" if height != 'N/A' else "    Resolution: N/A")
+                print(f"    Bitrate: {tbr} kbps" if tbr != 'N/A' else "    Bitrate: N/A")
+                print(f"    Video Codec: {vcodec}")
+                print(f"    Audio Codec: {acodec}")
+                print(f"    File Size: {self._format_bytes(filesize) if filesize != 'N/A' else 'N/A'}")
+                print()
+            
+            return formats
+
         except Exception as e:
             self.logger.error(f"Failed to list formats: {str(e)}")
             raise
@@ -474,24 +732,17 @@ class VideoDownloader:
         """Extract video information without downloading."""
         self.logger.info(f"Extracting video information for: {url}")
         
-        ydl_opts = {
-            'quiet': not self.config['verbose'],
-            'no_warnings': False,
-            'extract_flat': False,
-        }
-        
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                
-                # Log essential video information
-                self.logger.info(f"Title: {info.get('title', 'N/A')}")
-                self.logger.info(f"Duration: {info.get('duration', 'N/A')} seconds")
-                self.logger.info(f"Uploader: {info.get('uploader', 'N/A')}")
-                self.logger.info(f"View count: {info.get('view_count', 'N/A')}")
-                
-                return info
-                
+            info = self._extract_info(url)
+            
+            # Log essential video information
+            self.logger.info(f"Title: {info.get('title', 'N/A')}")
+            self.logger.info(f"Duration: {info.get('duration', 'N/A')} seconds")
+            self.logger.info(f"Uploader: {info.get('uploader', 'N/A')}")
+            self.logger.info(f"View count: {info.get('view_count', 'N/A')}")
+            
+            return info
+            
         except Exception as e:
             self.logger.error(f"Failed to extract video info: {str(e)}")
             raise
@@ -518,6 +769,11 @@ class VideoDownloader:
             self.debug_print("No formats detected, aborting download", 'error')
             return False
         
+        if self.config.get('auto_concurrency') and diagnostics.get('hls_detected'):
+            video_formats = diagnostics.get('video_only_formats') or []
+            best_video = max(video_formats, key=lambda x: x.get('height') or 0, default=None)
+            self.probe_concurrency(url, best_video['id'] if best_video else None)
+        
         # CRITICAL: Determine format strategy based on diagnostics
         self.debug_print("", 'info')
         self.debug_print("DETERMINING DOWNLOAD STRATEGY", 'info')
@@ -535,18 +791,13 @@ class VideoDownloader:
             self.debug_print("Detected HLS with separated streams (IBM/Ustream pattern)", 'warning')
             self.debug_print("Building format options for video+audio combination", 'info')
             
-            video_only_formats = [
-                f for f in diagnostics.get('available_formats', []) 
-                if f.get('is_hls') and f.get('height') and f.get('vcodec') != 'none' and f.get('acodec') == 'none'
-            ]
-            audio_only_formats = [
-                f for f in diagnostics.get('available_formats', []) 
-                if f.get('is_hls') and f.get('vcodec') == 'none' and f.get('acodec') != 'none'
-            ]
+            # Streams were already categorized during Test 3
+            video_only_formats = diagnostics.get('video_only_formats', [])
+            audio_only_formats = diagnostics.get('audio_only_formats', [])
             
             if video_only_formats and audio_only_formats:
                 # Sort by quality
-                video_only_formats.sort(key=lambda x: x.get('height', 0), reverse=True)
+                video_only_formats = sorted(video_only_formats, key=lambda x: x.get('height') or 0, reverse=True)
                 
                 # Add top quality combinations
                 for video in video_only_formats[:3]:  # Top 3 video qualities
@@ -568,16 +819,17 @@ class VideoDownloader:
                 'best',
             ])
         
-        # Remove duplicates while preserving order
-        format_options = list(dict.fromkeys(format_options))
+        # Remove duplicates while preserving order, then drop options diagnostics rule out
+        format_options = self._prune_format_options(list(dict.fromkeys(format_options)), diagnostics)
         
         if not format_options:
             self.debug_print("No valid format options found!", 'error')
             return False
         
         self.debug_print(f"Total format options to try: {len(format_options)}", 'info')
-        for i, fmt in enumerate(format_options):
-            self.debug_print(f"  Option {i+1}: {fmt}", 'debug')
+        if self.debug_level == 'max':
+            for i, fmt in enumerate(format_options):
+                self.debug_print(f"  Option {i+1}: {fmt}", 'debug')
         
         # Configure yt-dlp options
         base_ydl_opts = {
@@ -597,15 +849,6 @@ class VideoDownloader:
             'keepvideo': True,
             'nopart': False,  # Keep .part files
             
-            # Subtitles
-            'writesubtitles': self.config['extract_subtitles'],
-            'writeautomaticsub': self.config['auto_subtitles'],
-            'embedsubtitles': self.config['embed_subtitles'],
-            
-            # Thumbnails
-            'writethumbnail': self.config['download_thumbnail'],
-            'embedthumbnail': self.config['embed_thumbnail'],
-            
             # Post-processing
             'merge_output_format': self.config['merge_output_format'],
             'keepvideo': self.config['keep_video'],
@@ -621,6 +864,28 @@ class VideoDownloader:
             'ignoreerrors': False,
         }
         
+        # Subtitles / thumbnails: only pass enabled options so yt-dlp skips the extra requests
+        extras = {
+            'writesubtitles': self.config['extract_subtitles'],
+            'writeautomaticsub': self.config['auto_subtitles'],
+            'embedsubtitles': self.config['embed_subtitles'],
+            'writethumbnail': self.config['download_thumbnail'],
+            'embedthumbnail': self.config['embed_thumbnail'],
+        }
+        base_ydl_opts.update({k: v for k, v in extras.items() if v})
+        
+        # Transport: explicit choice wins; otherwise hand HLS fragments to aria2c when installed
+        external_downloader = self.config.get('external_downloader')
+        if not external_downloader and diagnostics.get('hls_detected') and shutil.which('aria2c'):
+            external_downloader = 'aria2c'
+        if external_downloader:
+            self.debug_print(f"Using external downloader: {external_downloader}", 'info')
+            base_ydl_opts['external_downloader'] = external_downloader
+            if external_downloader == 'aria2c':
+                base_ydl_opts['external_downloader_args'] = {
+                    'aria2c': ['-x', '16', '-s', '16', '-j', '16', '-k', '1M', '--file-allocation=falloc']
+                }
+        
         # Add post-processors if needed
         # NOTE: For HLS video+audio merging, yt-dlp handles this automatically
         # when using format selector like "video+audio". No post-processor needed.
@@ -633,61 +898,93 @@ class VideoDownloader:
         else:
             # Only add format converter if user wants a specific output format
             # and it differs from the source format
-            if self.config.get('merge_output_format') and self.config['merge_output_format'] != 'mp4':
-                self.debug_print(f"Adding format converter to {self.config['merge_output_format']}", 'info')
-                postprocessors.append({
-                    'key': 'FFmpegVideoConvertor',
-                    'preferedformat': self.config['merge_output_format'],
-                })
+            target_ext = self.config.get('merge_output_format')
+            if target_ext and target_ext != 'mp4':
+                if all('+' in fmt and '/' not in fmt for fmt in format_options):
+                    # Every option is a video+audio merge, already written as target_ext
+                    self.debug_print(f"Merged output is already {target_ext}, no converter needed", 'debug')
+                else:
+                    # mkv holds any codec, so a stream-copy remux is enough there
+                    pp_key = 'FFmpegVideoRemuxer' if target_ext == 'mkv' else 'FFmpegVideoConvertor'
+                    self.debug_print(f"Adding {pp_key} to {target_ext}", 'info')
+                    postprocessors.append({
+                        'key': pp_key,
+                        'preferedformat': target_ext,
+                    })
         
         if postprocessors:
-            base_ydl_opts['postprocessors'] = postprocessors
+            # Read-only defs: yt-dlp takes dict(pp) of each, so nothing downstream can alias them
+            base_ydl_opts['postprocessors'] = tuple(MappingProxyType(pp) for pp in postprocessors)
         
         # Try each format option
         self.debug_print("", 'info')
         self.debug_print("ATTEMPTING DOWNLOAD", 'info')
         self.debug_print("-" * 70, 'info')
         
-        for i, format_selector in enumerate(format_options):
+        # One YoutubeDL instance for all attempts: extractor setup and cookies are loaded once
+        ie_result = None
+        with yt_dlp.YoutubeDL(base_ydl_opts) as ydl:
             try:
-                self.debug_print(f"", 'progress')
-                self.debug_print(f"Attempt {i+1}/{len(format_options)}: Format '{format_selector}'", 'progress')
+                ie_result = ydl.extract_info(url, download=False, process=False)
+            except Exception as e:
+                # Leave extraction to the first attempt so its error is classified below
+                self.debug_print(f"Up-front metadata extraction failed: {str(e)[:150]}", 'warning')
+            if ie_result is not None:
+                format_options = self._screen_format_options(ydl, ie_result, format_options)
+            
+            for i, format_selector in enumerate(format_options):
+                try:
+                    if self._dbg_enabled:
+                        self.debug_print(f"", 'progress')
+                        self.debug_print(f"Attempt {i+1}/{len(format_options)}: Format '{format_selector}'", 'progress')
                 
-                ydl_opts = base_ydl_opts.copy()
-                ydl_opts['format'] = format_selector
+                    # Only the format changes between attempts: swap the selector in place
+                    ydl.params['format'] = format_selector
+                    ydl.format_selector = ydl.build_format_selector(format_selector)
                 
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    ydl.download([url])
+                    # Extract once; each attempt re-runs format selection on a fresh copy
+                    if ie_result is None:
+                        ie_result = ydl.extract_info(url, download=False, process=False)
+                    ydl.process_ie_result(copy.deepcopy(ie_result), download=True)
                 
-                self.debug_print("", 'success')
-                self.debug_print(f"Download completed successfully with format: {format_selector}", 'success')
-                self.debug_print("=" * 70, 'success')
-                return True
+                    self.debug_print("", 'success')
+                    self.debug_print(f"Download completed successfully with format: {format_selector}", 'success')
+                    self.debug_print("=" * 70, 'success')
+                    return True
                 
-            except yt_dlp.DownloadError as e:
-                error_msg = str(e)
-                self.debug_print(f"Format '{format_selector}' failed: {error_msg[:150]}...", 'warning')
+                # process_ie_result raises format-resolution misses as ExtractorError, which
+                # is not a DownloadError; both derive from YoutubeDLError
+                except yt_dlp.utils.YoutubeDLError as e:
+                    error_msg = str(e)
+                    if self._dbg_enabled:
+                        self.debug_print(f"Format '{format_selector}' failed: {error_msg[:150]}...", 'warning')
                 
-                # Check if it's a format-specific error
-                if "Requested format is not available" in error_msg:
-                    self.debug_print("  Reason: Format not available (trying next option)", 'debug')
-                    continue
-                elif "No video formats found" in error_msg:
-                    self.debug_print("  Reason: No video formats found (trying next option)", 'debug')
-                    continue
-                else:
-                    self.debug_print(f"  Reason: Other download error", 'warning')
-                    continue
+                    action = classify_download_error(error_msg)
+                    if action == 'ABORT':
+                        # No other selector can succeed (no formats, DRM, geo-block)
+                        self.debug_print("  Reason: Unrecoverable error (aborting remaining options)", 'warning')
+                        break
+                    elif action == 'RETRY_BACKOFF':
+                        if i + 1 < len(format_options):
+                            # Full jitter: sleep = random(0, min(cap, 2 ** attempt))
+                            delay = random.uniform(0, min(BACKOFF_CAP_SECONDS, 2 ** i))
+                            if self._dbg_enabled:
+                                self.debug_print(f"  Reason: Transient server error (retrying after {delay:.1f}s)", 'warning')
+                            time.sleep(delay)
+                        continue
+                    else:
+                        self.debug_print("  Reason: Format-specific error (trying next option)", 'debug')
+                        continue
                     
-            except Exception as e:
-                import traceback
-                error_details = traceback.format_exc()
-                self.debug_print(f"Unexpected error with format '{format_selector}':", 'error')
-                self.debug_print(f"Error type: {type(e).__name__}", 'error')
-                self.debug_print(f"Error message: {str(e)}", 'error')
-                if self.debug_level == 'max':
-                    self.debug_print(f"Full traceback:\n{error_details}", 'debug')
-                continue
+                except Exception as e:
+                    if self._dbg_enabled:
+                        self.debug_print(f"Unexpected error with format '{format_selector}':", 'error')
+                        self.debug_print(f"Error type: {type(e).__name__}", 'error')
+                        self.debug_print(f"Error message: {str(e)}", 'error')
+                    if self.debug_level == 'max':
+                        error_details = traceback.format_exc()
+                        self.debug_print(f"Full traceback:\n{error_details}", 'debug')
+                    continue
         
         # All formats failed
         self.debug_print("", 'error')
@@ -708,23 +1005,81 @@ class VideoDownloader:
         
         return False
     
+    def _prune_format_options(self, format_options: List[str], diagnostics: Dict[str, Any]) -> List[str]:
+        """Strip selector alternatives that need a separate audio stream when none exists.
+        
+        With no audio-only format detected, 'best+bestaudio/best' can only resolve
+        through its '/best' fallback, so the merge half is dropped and the options
+        deduplicated again. Formats with unknown codecs keep the list unchanged.
+        """
+        formats = diagnostics.get('available_formats') or []
+        if not formats or any(f.get('vcodec') in (None, 'unknown') for f in formats):
+            return format_options
+        if any(f['vcodec'] == 'none' and f.get('acodec') not in (None, 'none') for f in formats):
+            return format_options
+        
+        pruned = []
+        for fmt in format_options:
+            alternatives = [alt for alt in fmt.split('/') if 'bestaudio' not in alt]
+            if alternatives:
+                pruned.append('/'.join(alternatives))
+        pruned = list(dict.fromkeys(pruned))
+        if pruned != format_options:
+            self.debug_print(f"No audio-only streams: {len(format_options)} format option(s) "
+                             f"pruned to {len(pruned)}", 'debug')
+        return pruned
+    
+    def _screen_format_options(self, ydl, ie_result: Dict[str, Any], format_options: List[str]) -> List[str]:
+        """Drop selectors that cannot resolve against the already-extracted formats.
+        
+        Format selection runs locally on a copy of the info dict, so selectors that
+        would fail with "Requested format is not available" are discarded without
+        a network round-trip. Falls back to the full list if nothing resolves.
+        """
+        if ie_result.get('_type', 'video') != 'video':
+            return format_options
+        
+        viable = []
+        for format_selector in format_options:
+            try:
+                ydl.params['format'] = format_selector
+                ydl.format_selector = ydl.build_format_selector(format_selector)
+                ydl.process_ie_result(copy.deepcopy(ie_result), download=False)
+                viable.append(format_selector)
+            except Exception as e:
+                self.debug_print(f"Skipping format '{format_selector}': {str(e)[:150]}", 'debug')
+        
+        if not viable:
+            self.debug_print("No format option resolved locally; trying all options", 'warning')
+            return format_options
+        self.debug_print(f"{len(viable)}/{len(format_options)} format options resolve against available formats", 'info')
+        return viable
+    
     def save_progress_report(self):
         """Save progress report to file."""
         if not self.progress_data and not self.diagnostic_data:
             return
             
         report_file = Path(self.config['output_dir']) / 'logs' / 'session_report.json'
-        report_data = {
-            'timestamp': datetime.now().isoformat(),
+        report_data = normalize_report({
+            'timestamp': datetime.now(),
             'config': self.config,
             'progress_data': self.progress_data,
             'diagnostic_data': self.diagnostic_data,
+            'diagnostics_by_url': self._diag_cache,  # every URL of a --stdin-urls batch
             'optimal_format_found': self.optimal_format_found
-        }
+        })
         
+        # Write to a temp file and swap it in, so an interrupt never leaves a torn report
+        tmp_file = report_file.with_suffix('.json.tmp')
         try:
-            with open(report_file, 'w') as f:
-                json.dump(report_data, f, indent=2, default=str)
+            if HAS_ORJSON:
+                with open(tmp_file, 'wb', buffering=1 << 20) as f:
+                    f.write(orjson.dumps(report_data, option=orjson.OPT_INDENT_2))
+            else:
+                with open(tmp_file, 'w', buffering=1 << 20) as f:
+                    json.dump(report_data, f, indent=2)
+            os.replace(tmp_file, report_file)
             self.debug_print(f"Session report saved: {report_file}", 'info')
         except Exception as e:
             self.debug_print(f"Failed to save session report: {str(e)}", 'error')
@@ -733,9 +1088,9 @@ class VideoDownloader:
 def main():
     """Main function with command-line interface."""
     parser = argparse.ArgumentParser(description='Download IBM videos using yt-dlp')
-    parser.add_argument('url', nargs='?', 
-                       default='https://video.ibm.com/recorded/134516112',
-                       help='Video URL to download')
+    parser.add_argument('urls', nargs='*', metavar='url',
+                       help=f'Video URL(s) to download (default: {DEFAULT_URL}; several URLs are '
+                            f'diagnosed in parallel with --diagnostics, or downloaded before stdin with --stdin-urls)')
     parser.add_argument('--output-dir', '-o', default='./downloads',
                        help='Output directory for downloads')
     parser.add_argument('--quality', '-q', default='best',
@@ -758,9 +1113,23 @@ def main():
                        help='Skip all post-processing (use if post-processors cause errors)')
     parser.add_argument('--video-only', action='store_true',
                        help='Download video-only stream (skip audio if getting 403 errors)')
+    parser.add_argument('--concurrent-fragments', '-N', type=int, default=None,
+                       help='Number of fragments to download in parallel (default: 4)')
+    parser.add_argument('--auto-concurrency', action='store_true',
+                       help='Probe HLS fragment throughput to pick --concurrent-fragments (ignored with -N)')
+    parser.add_argument('--subs', action='store_true',
+                       help='Download subtitles')
+    parser.add_argument('--auto-subs', action='store_true',
+                       help='Download automatic subtitles')
+    parser.add_argument('--thumbnail', action='store_true',
+                       help='Download thumbnail')
+    parser.add_argument('--no-diag-cache', action='store_true',
+                       help='Ignore cached diagnostics and probe the URL again')
+    parser.add_argument('--stdin-urls', action='store_true',
+                       help='Read URLs from stdin (one per line) and download them in this process')
     parser.add_argument('--external-downloader', default=None,
                        choices=['aria2c', 'ffmpeg', 'curl', 'wget'],
-                       help='Use external downloader for better reliability')
+                       help='Use external downloader for better reliability (default: aria2c for HLS if installed)')
     
     args = parser.parse_args()
     
@@ -768,6 +1137,17 @@ def main():
     if args.verbose:
         args.debug_level = 'max'
     
+    # --stdin-urls only downloads (positional URLs first); otherwise only --diagnostics takes several URLs
+    if args.stdin_urls:
+        if args.diagnostics or args.info_only or args.list_formats:
+            parser.error('--stdin-urls cannot be combined with --diagnostics, --info-only or --list-formats')
+        args.url = None
+    else:
+        if len(args.urls) > 1 and not args.diagnostics:
+            parser.error('multiple URLs are only supported with --diagnostics (use --stdin-urls to download several)')
+        args.urls = args.urls or [DEFAULT_URL]
+        args.url = args.urls[0]
+    
     # Create custom configuration based on arguments
     config = {
         'output_dir': args.output_dir,
@@ -776,14 +1156,18 @@ def main():
         'video_quality': args.quality,
         'audio_quality': 'best',
         'prefer_free_formats': True,
-        'extract_subtitles': True,
-        'auto_subtitles': True,
+        'extract_subtitles': args.subs,
+        'auto_subtitles': args.auto_subs,
         'embed_subtitles': False,
-        'download_thumbnail': True,
+        'download_thumbnail': args.thumbnail,
         'embed_thumbnail': False,
         'retries': 3,
         'fragment_retries': 5,
-        'concurrent_fragments': 4,
+        'concurrent_fragments': args.concurrent_fragments or 4,
+        'auto_concurrency': args.auto_concurrency and args.concurrent_fragments is None,
+        'external_downloader': args.external_downloader,
+        'diagnostics_cache_ttl': 0 if args.no_diag_cache else 3600,
+        'info_cache_ttl': 0 if args.diagnostics else 600,
         'merge_output_format': args.format if not args.no_postprocess else None,
         'keep_video': True,
         'verbose': args.debug_level != 'none',
@@ -799,15 +1183,43 @@ def main():
             print(f"\n{'='*70}")
             print(f"IBM Video Downloader v2.1 (FIXED - Debug: {args.debug_level.upper()})")
             print(f"{'='*70}")
-            print(f"URL: {args.url}")
+            if args.url:
+                print(f"URL: {args.url}")
             print(f"Output Directory: {args.output_dir}")
             print(f"Quality: {args.quality}")
             print(f"Format: {args.format}")
             print(f"{'='*70}\n")
         
+        # Batch mode: one process (and one warm yt-dlp import/extractor set) for many URLs
+        if args.stdin_urls:
+            failed = []
+            for line in itertools.chain(args.urls, sys.stdin):
+                url = line.strip()
+                if not url or url.startswith('#'):
+                    continue
+                print(f"\nSTARTING DOWNLOAD: {url}\n")
+                ok = downloader.download_video(url)
+                if not ok:
+                    failed.append(url)
+                print(f"{'OK' if ok else 'FAILED'}: {url}")
+            downloader.save_progress_report()
+            if failed:
+                print(f"\n{len(failed)} download(s) failed:")
+                for url in failed:
+                    print(f"  {url}")
+                sys.exit(1)
+            return
+        
         # Run diagnostics if requested
         if args.diagnostics:
-            diagnostics = downloader.run_diagnostic_tests(args.url)
+            if len(args.urls) > 1:
+                batch = downloader.run_diagnostic_tests_batch(args.urls)
+                for url, diagnostics in batch.items():
+                    status = diagnostics.get('tested_working_format') or diagnostics.get('recommended_format') or 'none'
+                    print(f"{url}: accessible={diagnostics['url_accessible']}, "
+                          f"formats={diagnostics['format_count']}, format={status}")
+            else:
+                diagnostics = downloader.run_diagnostic_tests(args.url, use_cache=False)
             return
         
         # List formats if requested
@@ -847,11 +1259,13 @@ def main():
             print("DOWNLOAD COMPLETED SUCCESSFULLY!")
             print(f"Files saved to: {args.output_dir}")
             
-            # Check for downloaded files
-            video_files = list(Path(args.output_dir).glob("*.mp4"))
-            if video_files:
-                video_file = video_files[0]
-                file_size = video_file.stat().st_size / (1024**3)
+            # Check for downloaded files: newest mp4 is the one just written
+            with os.scandir(args.output_dir) as it:
+                mp4s = [(e.stat(), e.path) for e in it if e.name.endswith('.mp4') and e.is_file()]
+            if mp4s:
+                st, path = max(mp4s, key=lambda m: m[0].st_mtime)
+                video_file = Path(path)
+                file_size = st.st_size / (1024**3)
                 print(f"Video: {video_file.name} ({file_size:.2f} GB)")
                 
                 print(f"\nTo play the video:")
@@ -876,6 +1290,8 @@ def main():
         if args.debug_level == 'none':
             print("Try using --debug-level max for detailed error information.")
         sys.exit(1)
+    finally:
+        downloader.close()
 
 
 if __name__ == "__main__":
@@ -9,13 +9,25 @@ Dependencies: yt-dlp, requests (optional)
 
 import os
 import sys
+import atexit
 import logging
+import logging.handlers
+import queue
+import random
+import threading
+import functools
 import json
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Deque, Dict, List, NamedTuple, Optional, Any, Tuple
 import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import heapq
+import itertools
 import re
+import shutil
+import time
 
 try:
     import yt_dlp
@@ -24,21 +36,125 @@ except ImportError:
     print("Error: yt-dlp not installed. Run: pip install yt-dlp")
     sys.exit(1)
 
+try:
+    from diskcache import Cache
+    HAS_DISKCACHE = True
+except ImportError:
+    HAS_DISKCACHE = False
+
+try:
+    import av
+    HAS_AV = True
+except ImportError:
+    HAS_AV = False
+
+try:
+    import orjson
+
+    def _jdumpb(obj: Any, indent: bool = False) -> bytes:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, option=option)
+
+    def _jdumps(obj: Any, indent: bool = False) -> str:
+        return _jdumpb(obj, indent).decode()
+
+    _jloads = orjson.loads
+except ImportError:
+    def _jdumps(obj: Any, indent: bool = False) -> str:
+        return json.dumps(obj, indent=2 if indent else None)
+
+    def _jdumpb(obj: Any, indent: bool = False) -> bytes:
+        return _jdumps(obj, indent).encode()
+
+    _jloads = json.loads
+
 
 REDACT_KEYS = {"Cookie", "cookie", "Authorization", "authorization"}
+# Lower-cased suffixes: also catches Set-Cookie, Proxy-Authorization, any casing
+_REDACT_LOWER = tuple({k.lower() for k in REDACT_KEYS})
+_HLS_PROTOCOLS = frozenset({'m3u8', 'm3u8_native', 'm3u8_live'})
+PROGRESS_LOG_INTERVAL = 0.5  # seconds between progress log lines per file
+FAIL_REASONS_KEPT = 200  # selector failures kept for session_report.json
+FAIL_REASONS_SHOWN = 10  # most recent failures listed in the failure summary
+NETDBG_BUFFER_BYTES = 64 * 1024  # network_debug.jsonl bytes buffered between writes
+TIMESTAMP_RESOLUTION = 0.1  # seconds; debug records in one burst share a timestamp
+GIB = 1 << 30
+TMPFS_MIN_FREE = 4 * GIB  # only stage fragments in /dev/shm with at least this much room
+INFO_CACHE_TTL = 300  # seconds an extract_info result is reused within a session
+BACKOFF_CAP_SECONDS = 30
+SEP70 = '=' * 70
+SEP50 = '=' * 50
+VIDEO_EXTS = frozenset({'.mp4', '.mkv', '.webm'})
+EXT_PRIORITY = ('mp4', 'webm', 'mkv', 'flv')
+# Non-HLS selector keyed by (have preferred ext, have height cap)
+_SELECTOR_TEMPLATES = {
+    (True, True): 'bestvideo[height<={t}][ext={e}]+bestaudio/best',
+    (True, False): 'bestvideo[ext={e}]+bestaudio/best',
+    (False, True): 'bestvideo[height<={t}]+bestaudio/best',
+    (False, False): 'bestvideo+bestaudio/best',
+}
+_TRANSIENT_ERROR_RE = re.compile(r'HTTP Error (?:429|5\d\d)|timed out|Connection (?:reset|refused|aborted)'
+                                 r'|Temporary failure', re.IGNORECASE)
+
+
+class Fmt(NamedTuple):
+    """One row of diagnostics['available_formats']."""
+    id: str
+    ext: str
+    height: Optional[int]
+    vcodec: str
+    acodec: str
+    is_hls: bool
+
+
+def default_temp_dir() -> Optional[str]:
+    """RAM-backed scratch dir for fragments on Linux, if /dev/shm has room for a video."""
+    if not sys.platform.startswith('linux') or not os.path.isdir('/dev/shm'):
+        return None
+    try:
+        if shutil.disk_usage('/dev/shm').free < TMPFS_MIN_FREE:
+            return None
+    except OSError:
+        return None
+    return _tmpfs_scratch_path()
+
+
+def _tmpfs_scratch_path() -> str:
+    """This process's /dev/shm scratch path (no free-space check)."""
+    return f'/dev/shm/ytdlp-{os.getpid()}'
+
+# debug_print level names -> logging levels, console prefixes, and per --debug-level cutoffs
+_LEVELNO = {'debug': logging.DEBUG, 'info': logging.INFO, 'warning': logging.WARNING, 'error': logging.ERROR}
+_DEBUG_PREFIX = {
+    'debug': "🔍 DEBUG: ",
+    'info': "ℹ️  INFO: ",
+    'warning': "⚠️  WARNING: ",
+    'error': "❌ ERROR: "
+}
+_DEBUG_MIN_LEVEL = {'none': logging.CRITICAL + 1, 'min': logging.INFO, 'max': logging.DEBUG}
+
+
+def _plain(v: Any) -> Any:
+    """Coerce the non-JSON values a config may carry (Path, datetime, set) to JSON primitives."""
+    if isinstance(v, Path):
+        return str(v)
+    if isinstance(v, datetime):
+        return v.isoformat()
+    if isinstance(v, (set, frozenset)):
+        return list(v)
+    return v
+
+
+@functools.lru_cache(maxsize=256)
+def _is_sensitive(key: str) -> bool:
+    return key.lower().endswith(_REDACT_LOWER)
 
 
 def redact(d: Dict[str, Any]) -> Dict[str, Any]:
     """Redact sensitive values (shallow)."""
     if not isinstance(d, dict):
         return d
-    out = {}
-    for k, v in d.items():
-        if any(k.endswith(x) or k == x for x in REDACT_KEYS):
-            out[k] = "***REDACTED***"
-        else:
-            out[k] = v
-    return out
+    return {k: "***REDACTED***" if _is_sensitive(k) else v for k, v in d.items()}
 
 
 class VideoDownloader:
@@ -48,17 +164,38 @@ class VideoDownloader:
         self.config = config or self.get_default_config()
         self.debug_level = debug_level.lower()
         self.config['debug_level'] = self.debug_level
+        self._console_min_level = _DEBUG_MIN_LEVEL.get(self.debug_level, logging.DEBUG)
+        self._log_dir = Path(self.config['output_dir']) / 'logs'  # created by setup_logging
+        self._session_report_path = self._log_dir / 'session_report.json'
+        self._network_debug_path = self._log_dir / 'network_debug.jsonl'
         self.setup_logging()
         self.progress_data: Dict[str, Any] = {}
         self.diagnostic_data: Dict[str, Any] = {}
         self.force_audio_combination = False
-        self.fail_reasons: List[str] = []
+        # Per-selector failures: bounded history for the session report
+        self.fail_reasons: Deque[str] = deque(maxlen=FAIL_REASONS_KEPT)
+        self._last_log_ts: Dict[str, float] = {}
+        self._ts_cache: Tuple[float, str] = (float('-inf'), '')
+        self._netdbg_fd: Optional[int] = None  # O_APPEND fd on logs/network_debug.jsonl, opened on first record
+        self._netdbg_buf = bytearray()  # encoded records not yet written
+        self._netdbg_opts: Optional[Dict[str, Any]] = None  # redacted opts, built once per session
+        # YoutubeDL instances keyed by their options, so keep-alive connections are reused
+        self._ydl_pool: Dict[frozenset, yt_dlp.YoutubeDL] = {}
+        self._ydl_pool_lock = threading.Lock()
+        self._info_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        # Only the per-process tmpfs dir picked by default_temp_dir() is ours to delete
+        temp_dir = self.config.get('temp_dir')
+        self._owned_temp_dir: Optional[str] = temp_dir if temp_dir == _tmpfs_scratch_path() else None
+        self._diag_cache: Dict[str, Dict[str, Any]] = {}
+        # Cross-process metadata cache (optional dependency)
+        self._pcache = Cache(str(Path(self.config['output_dir']) / '.meta-cache')) if HAS_DISKCACHE else None
 
     def get_default_config(self) -> Dict[str, Any]:
         return {
             # Output settings
             'output_dir': './downloads',
             'output_template': '%(uploader)s - %(title)s.%(ext)s',
+            'temp_dir': default_temp_dir(),  # fragments/.part files; None -> output_dir
 
             # Quality / format selection
             'format_selector': 'best[ext=mp4]/best',
@@ -76,12 +213,16 @@ class VideoDownloader:
             # Network / extractor settings (strengthened)
             'retries': 3,
             'fragment_retries': 5,
-            'concurrent_fragments': 4,
+            'concurrent_fragments': 16,  # parallel HLS fragment fetches (--concurrent-fragments)
             'extractor_retries': 5,
             'socket_timeout': 30,
             'geo_bypass_country': 'US',
             'hls_prefer_native': True,   # often more tolerant for IBM/Ustream
             'hls_use_mpegts': True,      # better for discontinuities
+            'cachedir': None,            # yt-dlp cache; None -> <output_dir>/.ytdlp-cache
+            'extractor_args': None,      # e.g. {'youtube': {'player_client': ['web']}}
+            'metadata_cache_ttl': 3600,  # on-disk extract_info cache (needs diskcache); 0 disables
+            'refresh_metadata': False,
 
             # Post-processing
             'merge_output_format': 'mp4',
@@ -101,12 +242,14 @@ class VideoDownloader:
 
             # Logging
             'verbose': True,
-            'log_level': 'INFO'
+            'log_level': 'INFO',
+            'compact_reports': False,  # session_report.json without indentation
         }
 
     def setup_logging(self):
-        log_dir = Path(self.config['output_dir']) / 'logs'
+        log_dir = self._log_dir
         log_dir.mkdir(parents=True, exist_ok=True)
+        Path(self._cachedir()).mkdir(parents=True, exist_ok=True)
 
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         log_file = log_dir / f'download_{timestamp}.log'
@@ -121,66 +264,152 @@ class VideoDownloader:
             log_level = logging.DEBUG
             console_level = logging.DEBUG
 
+        # File records are formatted by the QueueHandler and written by a listener thread,
+        # so disk I/O never blocks yt-dlp's download threads. The console handler stays
+        # synchronous so log lines keep their order relative to print() output.
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
         logging.basicConfig(
             level=log_level,
             format='%(asctime)s - %(levelname)s - %(message)s',
             handlers=[
-                logging.FileHandler(log_file),
+                logging.handlers.QueueHandler(log_queue),
                 logging.StreamHandler()
             ],
             force=True
         )
+        self._log_listener = logging.handlers.QueueListener(log_queue, logging.FileHandler(log_file))
+        self._log_listener.start()
+        atexit.register(self._log_listener.stop)
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(log_level)
         self.logger.info(f"🔧 Debug level: {self.debug_level}")
         self.logger.info(f"📝 Log file: {log_file}")
-        self.logger.debug(f"🧩 Effective Configuration:\n{json.dumps(self._safe_config_snapshot(), indent=2)}")
+        self.logger.debug(f"🧩 Effective Configuration:\n{_jdumps(self._safe_config_snapshot(), indent=True)}")
 
     def _safe_config_snapshot(self) -> Dict[str, Any]:
-        cfg = dict(self.config)
+        cfg = {k: _plain(v) for k, v in self.config.items()}
         cfg['http_headers'] = redact(cfg.get('http_headers', {}))
         return cfg
 
-    def debug_print(self, message: str, level: str = 'info'):
-        if self.debug_level == 'none':
-            return
-        if self.debug_level == 'min' and level == 'debug':
+    def debug_print(self, message: str, level: str = 'info', *args):
+        """Log with a level prefix. With args, message is a %-format applied only if emitted."""
+        levelno = _LEVELNO.get(level, logging.INFO)
+        if levelno < self._console_min_level:
             return
-        prefix = {
-            'debug': "🔍 DEBUG:",
-            'info': "ℹ️  INFO:",
-            'warning': "⚠️  WARNING:",
-            'error': "❌ ERROR:"
-        }.get(level, "ℹ️  INFO:")
-        getattr(self.logger, level if level in ('debug', 'info', 'warning', 'error') else 'info')(f"{prefix} {message}")
+        self.logger.log(levelno, _DEBUG_PREFIX.get(level, _DEBUG_PREFIX['info']) + message, *args)
 
     # ---------- Diagnostics ----------
 
+    def _cachedir(self) -> str:
+        """Persistent yt-dlp cache (extractor/player data). Delete it to force a clean re-fetch."""
+        return self.config.get('cachedir') or str(Path(self.config['output_dir']) / '.ytdlp-cache')
+
     def _base_ydl_opts(self, extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Centralize yt-dlp options so all paths use the same network/extractor settings."""
+        cfg = self.config
+        get = cfg.get
+        silent = self.debug_level == 'none'
         opts = {
-            'retries': self.config['retries'],
-            'fragment_retries': self.config['fragment_retries'],
-            'concurrent_fragment_downloads': self.config['concurrent_fragments'],
-            'extractor_retries': self.config.get('extractor_retries', 3),
-            'socket_timeout': self.config.get('socket_timeout', 20),
-            'geo_bypass_country': self.config.get('geo_bypass_country', 'US'),
-            'http_headers': self.config.get('http_headers') or {},
-            'hls_prefer_native': self.config.get('hls_prefer_native', True),
-            'hls_use_mpegts': self.config.get('hls_use_mpegts', True),
-            'quiet': not self.config['verbose'] or self.debug_level == 'none',
-            'no_warnings': self.debug_level == 'none',
+            'retries': cfg['retries'],
+            'fragment_retries': cfg['fragment_retries'],
+            'concurrent_fragment_downloads': cfg['concurrent_fragments'],
+            'extractor_retries': get('extractor_retries', 3),
+            'socket_timeout': get('socket_timeout', 20),
+            'geo_bypass_country': get('geo_bypass_country', 'US'),
+            'http_headers': get('http_headers') or {},
+            'hls_prefer_native': get('hls_prefer_native', True),
+            'hls_use_mpegts': get('hls_use_mpegts', True),
+            'quiet': not cfg['verbose'] or silent,
+            'no_warnings': silent,
+            'cachedir': self._cachedir(),
         }
-        if self.config.get('cookies'):
-            opts['cookiefile'] = self.config['cookies']
-        if self.config.get('cookies_from_browser'):
-            opts['cookiesfrombrowser'] = self.config['cookies_from_browser']
+        extractor_args = get('extractor_args')
+        if extractor_args:
+            opts['extractor_args'] = extractor_args
+        cookies = get('cookies')
+        if cookies:
+            opts['cookiefile'] = cookies
+        cookies_from_browser = get('cookies_from_browser')
+        if cookies_from_browser:
+            opts['cookiesfrombrowser'] = cookies_from_browser
 
         if extra:
             opts.update(extra)
         return opts
 
-    def run_diagnostic_tests(self, url: str) -> Dict[str, Any]:
+    def _get_ydl(self, opts: Dict[str, Any]) -> yt_dlp.YoutubeDL:
+        """Return a pooled YoutubeDL for these exact options, creating it on first use."""
+        key = frozenset((k, repr(v)) for k, v in opts.items())  # order-insensitive without sorting
+        with self._ydl_pool_lock:
+            ydl = self._ydl_pool.get(key)
+            if ydl is None:
+                ydl = self._ydl_pool[key] = yt_dlp.YoutubeDL(opts)
+        return ydl
+
+    @staticmethod
+    def _set_format(ydl: yt_dlp.YoutubeDL, selector: str):
+        """Swap the format selector on a live YoutubeDL instead of building a new one."""
+        ydl.params['format'] = selector
+        ydl.format_selector = ydl.build_format_selector(selector)
+
+    def close(self):
+        """Close pooled YoutubeDL instances (cookie jars, open connections) and the metadata cache."""
+        with self._ydl_pool_lock:
+            for ydl in self._ydl_pool.values():
+                ydl.close()
+            self._ydl_pool.clear()
+        self._flush_network_debug()
+        if self._netdbg_fd is not None:
+            os.close(self._netdbg_fd)
+            self._netdbg_fd = None
+        # The per-process tmpfs scratch dir holds RAM; nothing in it is resumable across runs
+        if self._owned_temp_dir:
+            shutil.rmtree(self._owned_temp_dir, ignore_errors=True)
+        if self._pcache is not None:
+            self._pcache.close()
+
+    def _extract_with_backoff(self, ydl: yt_dlp.YoutubeDL, url: str) -> Dict[str, Any]:
+        """extract_info with full-jitter exponential backoff on transient (429/5xx/timeout) errors."""
+        max_tries = max(1, self.config.get('extractor_retries', 3))
+        deadline = time.monotonic() + self.config.get('socket_timeout', 20) * 4
+        for attempt in range(max_tries):
+            try:
+                return ydl.extract_info(url, download=False)
+            except (DownloadError, OSError) as e:
+                delay = random.uniform(0, min(BACKOFF_CAP_SECONDS, 2 ** attempt))
+                if (attempt == max_tries - 1 or not _TRANSIENT_ERROR_RE.search(str(e))
+                        or time.monotonic() + delay > deadline):
+                    raise
+                self.debug_print("Transient extract error, retry %d/%d in %.1fs: %s", 'warning',
+                                 attempt + 1, max_tries - 1, delay, e)
+                time.sleep(delay)
+
+    def _get_info(self, url: str, ydl_opts: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """extract_info once per URL; repeat callers within INFO_CACHE_TTL get the cached dict."""
+        cached = self._info_cache.get(url)
+        if cached and time.monotonic() - cached[0] < INFO_CACHE_TTL:
+            self.debug_print(f"Reusing extracted info for: {url}", 'debug')
+            return cached[1]
+        ttl = self.config.get('metadata_cache_ttl', 0)
+        # --refresh-metadata skips the lookup only; the fresh result below overwrites this URL's entry
+        use_pcache = self._pcache is not None and ttl
+        info = self._pcache.get(url) if use_pcache and not self.config.get('refresh_metadata') else None
+        if info is not None:
+            self.debug_print(f"Using on-disk metadata cache for: {url}", 'debug')
+        else:
+            opts = ydl_opts or self._base_ydl_opts({'quiet': True, 'no_warnings': True})
+            # _extract_with_backoff already retries extractor_retries times; don't multiply them
+            ydl = self._get_ydl({**opts, 'extractor_retries': 0})
+            info = ydl.sanitize_info(self._extract_with_backoff(ydl, url))
+            if use_pcache:
+                self._pcache.set(url, info, expire=ttl)
+        self._info_cache[url] = (time.monotonic(), info)
+        return info
+
+    def run_diagnostic_tests(self, url: str, use_cache: bool = True) -> Dict[str, Any]:
+        if use_cache and url in self._diag_cache:
+            self.diagnostic_data = self._diag_cache[url]
+            return self.diagnostic_data
         self.debug_print("Starting comprehensive diagnostic tests", 'info')
         diagnostics = {
             'url_accessible': False,
@@ -197,17 +426,15 @@ class VideoDownloader:
         try:
             # Test 1: URL accessibility / metadata
             self.debug_print("Test 1: Checking URL accessibility & metadata", 'info')
-            ydl_opts_basic = self._base_ydl_opts({'quiet': True, 'no_warnings': True})
             info = None
-            with yt_dlp.YoutubeDL(ydl_opts_basic) as ydl:
-                try:
-                    info = ydl.extract_info(url, download=False)
-                    diagnostics['url_accessible'] = True
-                    self.debug_print("✅ URL is accessible", 'info')
-                except Exception as e:
-                    diagnostics['issues_found'].append(f"URL not accessible: {str(e)}")
-                    self.debug_print(f"URL not accessible: {str(e)}", 'error')
-                    return diagnostics
+            try:
+                info = self._get_info(url)
+                diagnostics['url_accessible'] = True
+                self.debug_print("✅ URL is accessible", 'info')
+            except Exception as e:
+                diagnostics['issues_found'].append(f"URL not accessible: {str(e)}")
+                self.debug_print(f"URL not accessible: {str(e)}", 'error')
+                return diagnostics
 
             # Test 2: Metadata fields
             self.debug_print("Test 2: Testing metadata extraction", 'info')
@@ -234,15 +461,8 @@ class VideoDownloader:
                     height = fmt.get('height')
                     vcodec = fmt.get('vcodec', 'unknown')
                     acodec = fmt.get('acodec', 'unknown')
-                    is_hls = str(fid).startswith('hls-') or (fmt.get('protocol') == 'm3u8' or fmt.get('protocol') == 'm3u8_native')
-                    rec = {
-                        'id': fid,
-                        'ext': ext,
-                        'height': height,
-                        'vcodec': vcodec,
-                        'acodec': acodec,
-                        'is_hls': is_hls
-                    }
+                    is_hls = fmt.get('protocol') in _HLS_PROTOCOLS or (isinstance(fid, str) and fid.startswith('hls-'))
+                    rec = Fmt(fid, ext, height, vcodec, acodec, is_hls)
                     fmtz.append(rec)
 
                     if is_hls:
@@ -267,20 +487,20 @@ class VideoDownloader:
                     self.debug_print(f"   - Combined streams: {len(combined)}", 'info')
 
                     if combined:
-                        best_combined = max(combined, key=lambda x: x.get('height') or 0)
-                        diagnostics['recommended_format'] = best_combined['id']
-                        self.debug_print(f"🎯 Recommended combined format: {best_combined['id']} ({best_combined.get('height')}p)", 'info')
+                        best_combined = max(combined, key=lambda x: x.height or 0)
+                        diagnostics['recommended_format'] = best_combined.id
+                        self.debug_print(f"🎯 Recommended combined format: {best_combined.id} ({best_combined.height}p)", 'info')
                     elif video_only and audio_only:
-                        best_video = max(video_only, key=lambda x: x.get('height') or 0)
+                        best_video = max(video_only, key=lambda x: x.height or 0)
                         best_audio = audio_only[0]
-                        sel = f"{best_video['id']}+{best_audio['id']}"
+                        sel = f"{best_video.id}+{best_audio.id}"
                         diagnostics['recommended_format'] = sel
                         self.debug_print(f"🎯 Recommended video+audio combination: {sel}", 'info')
                     elif video_only:
-                        best_video = max(video_only, key=lambda x: x.get('height') or 0)
-                        diagnostics['recommended_format'] = best_video['id']
+                        best_video = max(video_only, key=lambda x: x.height or 0)
+                        diagnostics['recommended_format'] = best_video.id
                         diagnostics['issues_found'].append("No audio streams detected - video only")
-                        self.debug_print(f"Video-only format (no audio): {best_video['id']}", 'warning')
+                        self.debug_print(f"Video-only format (no audio): {best_video.id}", 'warning')
             else:
                 diagnostics['issues_found'].append("No formats found in metadata")
                 self.debug_print("No formats found", 'error')
@@ -293,18 +513,10 @@ class VideoDownloader:
                 'best',
                 'worst'
             ] if sel]
-            for selector in to_test:
-                test_opts = self._base_ydl_opts({'format': selector, 'simulate': True, 'quiet': True, 'no_warnings': True})
-                ok = True
-                err = None
-                try:
-                    with yt_dlp.YoutubeDL(test_opts) as ydl:
-                        ydl.extract_info(url, download=False)
-                    self.debug_print(f"✅ Selector works: {selector}", 'info')
-                except Exception as e:
-                    ok = False
-                    err = str(e)
-                    self.debug_print(f"Selector FAILED: {selector} -> {err}", 'warning')
+            # Each simulation is an independent extractor round-trip; run them side by side
+            with ThreadPoolExecutor(max_workers=len(to_test)) as ex:
+                results = list(ex.map(lambda sel: self._simulate_selector(url, sel), to_test))
+            for selector, (ok, err) in zip(to_test, results):
                 diagnostics['test_selectors'][selector] = {'ok': ok, 'error': err}
 
         except Exception as e:
@@ -312,33 +524,50 @@ class VideoDownloader:
             self.debug_print(f"Diagnostic test failed: {str(e)}", 'error')
 
         self.diagnostic_data = diagnostics
+        self._diag_cache[url] = diagnostics
         self._write_network_debug(url, phase="diagnostics")
         return diagnostics
 
+    def _simulate_selector(self, url: str, selector: str) -> Tuple[bool, Optional[str]]:
+        """Simulate a download with one format selector; returns (ok, error)."""
+        test_opts = self._base_ydl_opts({'format': selector, 'simulate': True, 'quiet': True, 'no_warnings': True})
+        try:
+            self._get_ydl(test_opts).extract_info(url, download=False)
+            self.debug_print("✅ Selector works: %s", 'info', selector)
+            return True, None
+        except Exception as e:
+            self.debug_print("Selector FAILED: %s -> %s", 'warning', selector, e)
+            return False, str(e)
+
     # ---------- Progress / Utilities ----------
 
     def progress_hook(self, d: Dict[str, Any]):
         if d['status'] == 'downloading':
-            filename = d.get('filename', 'Unknown')
-            if 'total_bytes' in d and d['total_bytes']:
-                percent = (d['downloaded_bytes'] / d['total_bytes']) * 100
-            else:
-                percent = 0.0
-            speed = d.get('speed', 0)
-            eta = d.get('eta', 0)
+            get = d.get
+            filename = get('filename', 'Unknown')
+            downloaded = get('downloaded_bytes')
+            total = get('total_bytes')
+            percent = (downloaded / total) * 100 if total else 0.0
+            speed = get('speed', 0)
+            eta = get('eta', 0)
+            self.progress_data[filename] = {
+                'percent': percent,
+                'speed': speed,
+                'eta': eta,
+                'downloaded': downloaded,
+                'total': total
+            }
+            # Fires per fragment; only log a sampled tick
+            now = time.monotonic()
+            if now - self._last_log_ts.get(filename, 0.0) < PROGRESS_LOG_INTERVAL:
+                return
+            self._last_log_ts[filename] = now
             self.logger.info(
                 f"⬇️  Downloading: {percent:.1f}% | "
                 f"Speed: {self._format_bytes(speed)}/s | "
                 f"ETA: {eta}s | "
                 f"File: {os.path.basename(filename)}"
             )
-            self.progress_data[filename] = {
-                'percent': percent,
-                'speed': speed,
-                'eta': eta,
-                'downloaded': d.get('downloaded_bytes'),
-                'total': d.get('total_bytes')
-            }
         elif d['status'] == 'finished':
             filename = d.get('filename', 'Unknown')
             self.logger.info(f"✅ Download finished: {os.path.basename(filename)}")
@@ -358,12 +587,9 @@ class VideoDownloader:
 
     def list_available_formats(self, url: str) -> List[Dict[str, Any]]:
         self.logger.info(f"📋 Listing available formats for: {url}")
-        ydl_opts = self._base_ydl_opts({'extract_flat': False})
-
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                formats = info.get('formats', []) or []
+            info = self._get_info(url, self._base_ydl_opts({'extract_flat': False}))
+            formats = info.get('formats', []) or []
         except DownloadError as e:
             self.logger.error(f"Extractor says no formats: {str(e)}")
             self.logger.info("🔧 Falling back to diagnostics-derived formats…")
@@ -383,11 +609,11 @@ class VideoDownloader:
         fmt_list = []
         for f in diagnostics.get('available_formats', []):
             fmt_list.append({
-                'format_id': f['id'],
-                'ext': f.get('ext', 'mp4'),
-                'height': f.get('height'),
-                'vcodec': f.get('vcodec', 'unknown'),
-                'acodec': f.get('acodec', 'unknown'),
+                'format_id': f.id,
+                'ext': f.ext or 'mp4',
+                'height': f.height,
+                'vcodec': f.vcodec or 'unknown',
+                'acodec': f.acodec or 'unknown',
             })
         return fmt_list
 
@@ -415,11 +641,19 @@ class VideoDownloader:
             print(f"    Audio Codec: {acodec}")
             print()
 
-    def get_video_info(self, url: str) -> Dict[str, Any]:
+    def get_video_info(self, url: str, fast: bool = False) -> Dict[str, Any]:
+        """Extract video metadata.
+
+        fast=True skips format processing (sorting, selection checks) when only
+        title/duration/uploader are needed; the result is not cached because it
+        lacks processed formats.
+        """
         self.logger.info(f"🔎 Extracting video information for: {url}")
-        ydl_opts = self._base_ydl_opts({'extract_flat': False})
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
+        if fast and url not in self._info_cache:
+            opts = self._base_ydl_opts({'extract_flat': 'in_playlist', 'noplaylist': True})
+            info = self._get_ydl(opts).extract_info(url, download=False, process=False)
+        else:
+            info = self._get_info(url, self._base_ydl_opts({'extract_flat': False}))
         # Short, high-signal log lines:
         self.logger.info(f"🎞️  Title: {info.get('title', 'N/A')}")
         self.logger.info(f"⏱️  Duration: {info.get('duration', 'N/A')} s")
@@ -429,76 +663,101 @@ class VideoDownloader:
 
     # ---------- Format Selection ----------
 
-    def get_optimal_format_selector(self, url: str, preferred_quality: str = "best") -> str:
+    def get_optimal_format_selector(self, url: str, preferred_quality: str = "best",
+                                    info: Optional[Dict[str, Any]] = None,
+                                    diagnostics: Optional[Dict[str, Any]] = None) -> str:
         try:
             self.debug_print("Select optimal format via diagnostics", 'info')
-            diagnostics = self.run_diagnostic_tests(url)
+            if diagnostics is None:
+                diagnostics = self.run_diagnostic_tests(url)
 
             if not diagnostics.get('format_detection'):
                 self.debug_print("No formats detected, using fallback 'bestvideo+bestaudio/best'", 'warning')
                 return 'bestvideo+bestaudio/best'
 
             if diagnostics.get('hls_detected'):
-                fmts = diagnostics.get('available_formats', [])
-                video_streams = [f for f in fmts if f.get('height') and f.get('vcodec') != 'none']
-                audio_streams = [f for f in fmts if (not f.get('height')) and f.get('vcodec') == 'none' and f.get('acodec') != 'none']
-                combined_streams = [f for f in fmts if f.get('height') and f.get('acodec') not in (None, 'none')]
+                combined_streams, video_streams, audio_streams = self._bucket_formats(
+                    diagnostics.get('available_formats', []), hls_only=False, top=1)
 
                 if combined_streams:
-                    best_combined = max(combined_streams, key=lambda x: x.get('height') or 0)
-                    sel = best_combined['id']
+                    best_combined = combined_streams[0]
+                    sel = best_combined.id
                     self.debug_print(f"Using combined HLS stream: {sel}", 'info')
                     return sel
                 elif video_streams and audio_streams:
-                    best_video = max(video_streams, key=lambda x: x.get('height') or 0)
+                    best_video = video_streams[0]
                     best_audio = audio_streams[0]
-                    sel = f"{best_video['id']}+{best_audio['id']}"
+                    sel = f"{best_video.id}+{best_audio.id}"
                     self.debug_print(f"Combining HLS video+audio: {sel}", 'info')
                     return sel
                 elif video_streams:
-                    best_video = max(video_streams, key=lambda x: x.get('height') or 0)
-                    self.debug_print(f"Only video streams present, selecting: {best_video['id']} (⚠️ may be silent)", 'warning')
-                    return best_video['id']
+                    best_video = video_streams[0]
+                    self.debug_print(f"Only video streams present, selecting: {best_video.id} (⚠️ may be silent)", 'warning')
+                    return best_video.id
 
             # Non-HLS or no height info
-            info = self.get_video_info(url)
+            if info is None:
+                info = self.get_video_info(url)
             formats = info.get('formats', []) or []
             if not formats:
                 return 'bestvideo+bestaudio/best'
 
-            exts = [f.get('ext') for f in formats if f.get('ext')]
-            height_vals = [f.get('height') for f in formats if f.get('height')]
+            exts = {f.get('ext') for f in formats}
+            max_h = max((f.get('height') or 0 for f in formats), default=0)
 
-            ext_priority = ['mp4', 'webm', 'mkv', 'flv']
-            best_ext = next((e for e in ext_priority if e in exts), None)
+            best_ext = next((e for e in EXT_PRIORITY if e in exts), None)
 
-            if height_vals:
-                max_h = max(height_vals)
-                if preferred_quality == "best":
-                    return f"bestvideo[ext={best_ext}]+bestaudio/best" if best_ext else "bestvideo+bestaudio/best"
-                else:
-                    try:
-                        pref_h = int(preferred_quality.replace('p', ''))
-                        target = min(pref_h, max_h)
-                        if best_ext:
-                            return f"bestvideo[height<={target}][ext={best_ext}]+bestaudio/best"
-                        return f"bestvideo[height<={target}]+bestaudio/best"
-                    except ValueError:
-                        return f"bestvideo[ext={best_ext}]+bestaudio/best" if best_ext else "bestvideo+bestaudio/best"
-            else:
-                return f"bestvideo[ext={best_ext}]+bestaudio/best" if best_ext else "bestvideo+bestaudio/best"
+            target = None
+            if max_h and preferred_quality != "best":
+                try:
+                    target = min(int(preferred_quality.replace('p', '')), max_h)
+                except ValueError:
+                    target = None
+            return _SELECTOR_TEMPLATES[(bool(best_ext), bool(target))].format(t=target, e=best_ext)
         except Exception as e:
             self.debug_print(f"Could not determine optimal format: {str(e)}", 'warning')
             return 'bestvideo+bestaudio/best'
 
+    @staticmethod
+    def _bucket_formats(fmts: List[Fmt], hls_only: bool = True,
+                        top: int = 3) -> Tuple[List[Fmt], List[Fmt], List[Fmt]]:
+        """Split diagnostic format rows into (combined, video_only, audio_only) in one pass.
+
+        combined/video_only hold the `top` tallest rows, tallest first; audio_only
+        keeps manifest order.
+        """
+        combined, v_only, a_only = [], [], []
+        for f in fmts:
+            if hls_only and not f.is_hls:
+                continue
+            has_audio = f.acodec not in (None, 'none')
+            if f.height:
+                if has_audio:
+                    combined.append(f)
+                elif f.vcodec != 'none':
+                    v_only.append(f)
+            elif f.vcodec == 'none' and has_audio:
+                a_only.append(f)
+        height = lambda x: x.height or 0
+        return heapq.nlargest(top, combined, key=height), heapq.nlargest(top, v_only, key=height), a_only
+
+    def _paths_opts(self, output_dir: Path) -> Dict[str, Any]:
+        """Route temporary files to temp_dir; the finished file still lands in output_dir."""
+        temp_dir = self.config.get('temp_dir')
+        if not temp_dir:
+            return {}
+        # yt-dlp only applies 'paths' to a relative outtmpl
+        return {'outtmpl': self.config['output_template'],
+                'paths': {'home': str(output_dir), 'temp': temp_dir}}
+
     # ---------- Download ----------
 
     def download_video(self, url: str) -> bool:
         self.debug_print(f"Starting download for: {url}", 'info')
 
         output_dir = Path(self.config['output_dir'])
-        output_dir.mkdir(parents=True, exist_ok=True)
 
+        # output_dir already exists: setup_logging creates output_dir/logs in __init__
         self.debug_print("Pre-download diagnostics", 'info')
         diagnostics = self.run_diagnostic_tests(url)
 
@@ -508,7 +767,9 @@ class VideoDownloader:
 
         # Determine optimal selector and full fallback chain
         try:
-            optimal_format = diagnostics.get('recommended_format') or self.get_optimal_format_selector(url, self.config['video_quality'])
+            optimal_format = diagnostics.get('recommended_format') or self.get_optimal_format_selector(
+                url, self.config['video_quality'], info=self._info_cache.get(url, (0, None))[1],
+                diagnostics=diagnostics)
         except Exception as e:
             self.debug_print(f"Optimal format derivation failed, using default: {str(e)}", 'warning')
             optimal_format = self.config['format_selector']
@@ -516,22 +777,18 @@ class VideoDownloader:
         format_options: List[str] = []
 
         if diagnostics.get('hls_detected'):
-            v_only = [f for f in diagnostics.get('available_formats', []) if f.get('is_hls') and f.get('height') and f.get('vcodec') != 'none' and (f.get('acodec') in (None, 'none'))]
-            a_only = [f for f in diagnostics.get('available_formats', []) if f.get('is_hls') and (not f.get('height')) and f.get('vcodec') == 'none' and f.get('acodec') not in (None, 'none')]
-            combined = [f for f in diagnostics.get('available_formats', []) if f.get('is_hls') and f.get('height') and f.get('acodec') not in (None, 'none')]
+            combined, v_only, a_only = self._bucket_formats(diagnostics.get('available_formats', []))
 
             if combined:
-                combined.sort(key=lambda x: x.get('height', 0), reverse=True)
-                format_options.extend([f['id'] for f in combined[:3]])
+                format_options.extend([f.id for f in combined[:3]])
 
             if v_only and a_only:
-                v_only.sort(key=lambda x: x.get('height', 0), reverse=True)
                 for v in v_only[:3]:
                     for a in a_only[:2]:
-                        format_options.append(f"{v['id']}+{a['id']}")
+                        format_options.append(f"{v.id}+{a.id}")
 
             if v_only:
-                format_options.extend([f['id'] for f in v_only[:2]])  # may be silent
+                format_options.extend([f.id for f in v_only[:2]])  # may be silent
 
         # Generic fallbacks (ordered)
         format_options.extend([
@@ -557,6 +814,7 @@ class VideoDownloader:
         # Base yt-dlp options
         ydl_base = self._base_ydl_opts({
             'outtmpl': str(output_dir / self.config['output_template']),
+            **self._paths_opts(output_dir),
             'merge_output_format': self.config['merge_output_format'],
             'keepvideo': self.config['keep_video'],
             'writesubtitles': self.config['extract_subtitles'],
@@ -569,24 +827,48 @@ class VideoDownloader:
         })
 
         # Post-processors
+        # Post-processors: one container pass at most. mp4/mkv can take the source streams
+        # as-is, so remux (stream copy); only webm may need a real re-encode.
         postprocessors = []
-        if self.config['merge_output_format']:
-            postprocessors.append({'key': 'FFmpegVideoConvertor', 'preferedformat': self.config['merge_output_format']})
-        if diagnostics.get('hls_detected'):
-            self.debug_print("Adding FFmpeg remux for HLS compatibility", 'info')
-            postprocessors.append({'key': 'FFmpegVideoRemux', 'preferedformat': self.config['merge_output_format'] or 'mp4'})
+        target_ext = self.config['merge_output_format'] or ('mp4' if diagnostics.get('hls_detected') else None)
+        source_exts = {f.ext for f in diagnostics.get('available_formats', [])}
+        if target_ext and source_exts == {target_ext}:
+            self.debug_print(f"All formats are already {target_ext}, no container post-processing", 'debug')
+        elif target_ext:
+            pp_key = 'FFmpegVideoConvertor' if target_ext == 'webm' else 'FFmpegVideoRemuxer'
+            self.debug_print(f"Adding {pp_key} to {target_ext}", 'info')
+            postprocessors.append({'key': pp_key, 'preferedformat': target_ext})
         if postprocessors:
             ydl_base['postprocessors'] = postprocessors
 
-        # Try formats in order
-        for i, selector in enumerate(format_options, 1):
+        # One compound selector: yt-dlp resolves the whole '/' cascade against a single extraction
+        compound = '/'.join(dict.fromkeys(alt for sel in format_options for alt in sel.split('/')))
+        retry_individually = True
+        ydl = self._get_ydl(ydl_base)  # only 'format' changes between attempts
+        try:
+            self.debug_print(f"Try compound selector ({len(format_options)} alternatives)", 'info')
+            self._set_format(ydl, compound)
+            ydl.download([url])
+            self.debug_print("✅ Download OK with compound selector", 'info')
+            self._write_network_debug(url, phase="download_ok", extra={'selector': compound})
+            return True
+        except DownloadError as e:
+            msg = str(e)
+            self.fail_reasons.append(f"<compound>: {msg}")
+            # None of the alternatives resolved, so retrying them one by one cannot help
+            retry_individually = "Requested format is not available" not in msg
+            self.debug_print(f"Compound selector failed: {msg}", 'warning')
+        except Exception as e:
+            self.fail_reasons.append(f"<compound>: {str(e)}")
+            self.debug_print(f"Unexpected error (compound selector): {str(e)}", 'error')
+
+        # Safety net: a resolvable format failed mid-download, so try each selector in order
+        for i, selector in enumerate(format_options if retry_individually else [], 1):
             try:
-                self.debug_print(f"[{i}/{len(format_options)}] Try selector: {selector}", 'info')
-                ydl_opts = dict(ydl_base)
-                ydl_opts['format'] = selector
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    ydl.download([url])
-                self.debug_print(f"✅ Download OK with: {selector}", 'info')
+                self.debug_print("[%d/%d] Try selector: %s", 'info', i, len(format_options), selector)
+                self._set_format(ydl, selector)
+                ydl.download([url])
+                self.debug_print("✅ Download OK with: %s", 'info', selector)
                 self._write_network_debug(url, phase="download_ok", extra={'selector': selector})
                 return True
             except DownloadError as e:
@@ -594,17 +876,17 @@ class VideoDownloader:
                 self.fail_reasons.append(f"{selector}: {msg}")
                 # Make common failures explicit in logs:
                 if "Requested format is not available" in msg:
-                    self.debug_print(f"Selector failed (not available): {selector}", 'warning')
+                    self.debug_print("Selector failed (not available): %s", 'warning', selector)
                     continue
                 elif "No video formats found" in msg:
-                    self.debug_print(f"No formats found via selector: {selector}", 'warning')
+                    self.debug_print("No formats found via selector: %s", 'warning', selector)
                     continue
                 else:
-                    self.debug_print(f"Serious download error ({selector}): {msg}", 'error')
+                    self.debug_print("Serious download error (%s): %s", 'error', selector, msg)
                     continue
             except Exception as e:
                 self.fail_reasons.append(f"{selector}: {str(e)}")
-                self.debug_print(f"Unexpected error ({selector}): {str(e)}", 'error')
+                self.debug_print("Unexpected error (%s): %s", 'error', selector, e)
                 continue
 
         # Last-ditch fallback
@@ -612,6 +894,7 @@ class VideoDownloader:
         try:
             final_opts = self._base_ydl_opts({
                 'outtmpl': str(output_dir / self.config['output_template']),
+                **self._paths_opts(output_dir),
                 'quiet': False,
                 'no_warnings': False,
             })
@@ -640,6 +923,16 @@ class VideoDownloader:
             if file_path.exists():
                 verification['exists'] = True
                 verification['size_mb'] = file_path.stat().st_size / (1024**2)
+                if HAS_AV:
+                    # In-process libavformat probe: no fork, no ffprobe startup, no JSON round-trip
+                    try:
+                        with av.open(str(file_path)) as container:
+                            verification['playable'] = True
+                            if container.duration is not None:
+                                verification['duration'] = container.duration / av.time_base
+                        return verification
+                    except Exception as e:
+                        verification['issues'].append(f"PyAV open failed: {str(e)}")
                 try:
                     import subprocess
                     result = subprocess.run(
@@ -647,7 +940,7 @@ class VideoDownloader:
                         capture_output=True, text=True, timeout=30
                     )
                     if result.returncode == 0:
-                        probe_data = json.loads(result.stdout)
+                        probe_data = _jloads(result.stdout)
                         if 'format' in probe_data:
                             verification['playable'] = True
                             verification['duration'] = float(probe_data['format'].get('duration', 0))
@@ -666,41 +959,53 @@ class VideoDownloader:
     def save_progress_report(self):
         if not self.progress_data and not self.diagnostic_data:
             return
-        report_file = Path(self.config['output_dir']) / 'logs' / 'session_report.json'
+        self._flush_network_debug()
+        report_file = self._session_report_path
         report = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': self._now_iso(),
             'config': self._safe_config_snapshot(),
             'progress_data': self.progress_data,
-            'diagnostic_data': self.diagnostic_data,
-            'fail_reasons': self.fail_reasons
+            'diagnostic_data': {**self.diagnostic_data,
+                                'available_formats': [f._asdict() for f in self.diagnostic_data.get('available_formats', [])]},
+            'fail_reasons': list(self.fail_reasons)
         }
         try:
-            with open(report_file, 'w') as f:
-                json.dump(report, f, indent=2, default=str)
+            with open(report_file, 'wb') as f:
+                f.write(_jdumpb(report, indent=not self.config.get('compact_reports')))
             self.debug_print(f"Session report saved: {report_file}", 'info')
         except Exception as e:
             self.debug_print(f"Failed to save session report: {str(e)}", 'error')
 
     def _dump_failure_summary(self, diagnostics: Dict[str, Any], format_options: List[str]):
-        self.debug_print("📊 Download failure summary:", 'error')
-        self.debug_print(f"  - URL accessible: {diagnostics.get('url_accessible', False)}", 'error')
-        self.debug_print(f"  - Formats found: {diagnostics.get('format_count', 0)}", 'error')
-        self.debug_print(f"  - HLS detected: {diagnostics.get('hls_detected', False)}", 'error')
-        self.debug_print(f"  - Selectors tried: {len(format_options)}", 'error')
-        for fr in self.fail_reasons[-10:]:
-            self.debug_print(f"  - Reason: {fr}", 'error')
+        """Log the failure summary as one multi-line record (skipped entirely under --debug-level none)."""
+        if self._console_min_level > logging.ERROR:
+            return
+        lines = [
+            "📊 Download failure summary:",
+            f"  - URL accessible: {diagnostics.get('url_accessible', False)}",
+            f"  - Formats found: {diagnostics.get('format_count', 0)}",
+            f"  - HLS detected: {diagnostics.get('hls_detected', False)}",
+            f"  - Selectors tried: {len(format_options)}",
+        ]
+        # Walk back from the newest entry instead of copying the whole bounded history
+        recent = list(itertools.islice(reversed(self.fail_reasons), FAIL_REASONS_SHOWN))
+        lines.extend(f"  - Reason: {fr}" for fr in reversed(recent))
+        self.debug_print("\n".join(lines), 'error')
 
     def _write_network_debug(self, url: str, phase: str, extra: Optional[Dict[str, Any]] = None):
-        """Write a concise network/debug bundle to logs/network_debug.json (append)."""
+        """Append a concise network/debug record to logs/network_debug.jsonl (buffered)."""
         try:
-            log_dir = Path(self.config['output_dir']) / 'logs'
-            log_dir.mkdir(parents=True, exist_ok=True)
-            p = log_dir / 'network_debug.json'
+            if self._netdbg_fd is None:
+                self._netdbg_fd = os.open(self._network_debug_path,
+                                          os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+                atexit.register(self._flush_network_debug)
+            if self._netdbg_opts is None:
+                self._netdbg_opts = redact(self._base_ydl_opts())
             payload = {
-                'timestamp': datetime.now().isoformat(),
+                'timestamp': self._now_iso(),
                 'phase': phase,
                 'url': url,
-                'yt_dlp_opts': redact(self._base_ydl_opts()),
+                'yt_dlp_opts': self._netdbg_opts,
                 'diagnostics_summary': {
                     'format_count': self.diagnostic_data.get('format_count'),
                     'hls_detected': self.diagnostic_data.get('hls_detected'),
@@ -710,14 +1015,118 @@ class VideoDownloader:
             }
             if extra:
                 payload['extra'] = extra
-            # Append as JSONL
-            with p.open('a') as f:
-                f.write(json.dumps(payload) + "\n")
+            buf = self._netdbg_buf
+            buf += _jdumpb(payload)
+            buf += b"\n"
+            if len(buf) >= NETDBG_BUFFER_BYTES:
+                self._flush_network_debug()
         except Exception as e:
             self.debug_print(f"Could not write network debug: {str(e)}", 'warning')
 
+    def _now_iso(self) -> str:
+        """Wall-clock ISO timestamp, re-formatted at most every TIMESTAMP_RESOLUTION seconds."""
+        t = time.monotonic()
+        if t - self._ts_cache[0] > TIMESTAMP_RESOLUTION:
+            self._ts_cache = (t, datetime.now().isoformat())
+        return self._ts_cache[1]
+
+    def _flush_network_debug(self):
+        """Write pending records with one os.write; O_APPEND keeps each batch contiguous."""
+        if self._netdbg_fd is None or not self._netdbg_buf:
+            return
+        data = bytes(self._netdbg_buf)
+        self._netdbg_buf.clear()
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self._netdbg_fd, view):]
+
     # ---------- CLI ----------
 
+@functools.lru_cache(maxsize=8)
+def _config_template(output_dir: str, quality: str, fmt: str, debug_level: str, concurrent_fragments: int,
+                 cookies: Optional[str], cookies_from_browser: Optional[str], referer: Optional[str],
+                 origin: Optional[str], user_agent: Optional[str], refresh_metadata: bool,
+                 compact_reports: bool) -> Dict[str, Any]:
+    """Shared, cached config for a set of CLI arguments; use _make_config for a mutable copy."""
+    headers = {
+        'Referer': referer or 'https://video.ibm.com/',
+        'Origin': origin or 'https://video.ibm.com',
+        'User-Agent': user_agent or 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+                                    '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+    }
+
+    return {
+        'output_dir': output_dir,
+        'output_template': '%(uploader)s - %(title)s.%(ext)s',
+        'format_selector': f'best[ext={fmt}]/best',
+        'video_quality': quality,
+        'audio_quality': 'best',
+        'prefer_free_formats': True,
+        'extract_subtitles': True,
+        'auto_subtitles': True,
+        'embed_subtitles': False,
+        'download_thumbnail': True,
+        'embed_thumbnail': False,
+        'retries': 3,
+        'fragment_retries': 5,
+        'concurrent_fragments': concurrent_fragments,
+        'merge_output_format': fmt,
+        'keep_video': True,
+        'verbose': debug_level != 'none',
+        'log_level': 'DEBUG' if debug_level == 'max' else 'INFO',
+        # strengthened defaults:
+        'extractor_retries': 5,
+        'socket_timeout': 30,
+        'geo_bypass_country': 'US',
+        'hls_prefer_native': True,
+        'hls_use_mpegts': True,
+        # cookies / headers
+        'cookies': cookies,
+        'cookies_from_browser': cookies_from_browser,
+        'http_headers': headers,
+        'metadata_cache_ttl': 3600,
+        'refresh_metadata': refresh_metadata,
+        'compact_reports': compact_reports,
+    }
+
+
+def _make_config(*args) -> Dict[str, Any]:
+    """Fresh downloader config for the _config_template arguments.
+
+    Copies the nested headers so downloaders never share them, and picks temp_dir
+    now: a previous downloader's close() may have removed the last one.
+    """
+    template = _config_template(*args)
+    return {**template, 'http_headers': dict(template['http_headers']), 'temp_dir': default_temp_dir()}
+
+
+def _emit(lines: List[str]):
+    """Write a block of console lines with a single stdout write."""
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
+
+
+PLAY_HELP = (
+    "🎬 To play the video:\n"
+    "   macOS: open '{file}'\n"
+    "   Linux: vlc '{file}' or mpv '{file}'\n"
+    "   Windows: start \"{file}\"\n"
+    "   Universal: Use VLC or mpv"
+)
+
+FAILURE_HELP = (
+    "\n" + SEP70,
+    "❌ DOWNLOAD FAILED",
+    "🔧 Troubleshooting suggestions:",
+    "  1) Add headers: --referer https://video.ibm.com/  --origin https://video.ibm.com",
+    "  2) Try cookies: --cookies cookies.txt  or  --cookies-from-browser chrome",
+    "  3) Run: --diagnostics (to see selectors and HLS audio-groups)",
+    "  4) Use explicit selectors via --quality (e.g., 720p) or edit format logic",
+    "  5) Check logs/network_debug.jsonl and downloads/logs/*.log",
+    SEP70,
+)
+
+
 def main():
     parser = argparse.ArgumentParser(description='Download IBM videos using yt-dlp (robust)')
     parser.add_argument('url', nargs='?', default='https://video.ibm.com/recorded/134516112', help='Video URL to download')
@@ -737,104 +1146,76 @@ def main():
     parser.add_argument('--referer', help='Override Referer header (defaults to https://video.ibm.com/)')
     parser.add_argument('--origin', help='Override Origin header (defaults to https://video.ibm.com)')
     parser.add_argument('--user-agent', help='Override User-Agent header')
+    parser.add_argument('--concurrent-fragments', '-N', type=int, default=16, help='Number of HLS fragments to download in parallel (default: 16)')
+    parser.add_argument('--refresh-metadata', action='store_true', help='Ignore the on-disk metadata cache and re-extract')
+    parser.add_argument('--compact-reports', action='store_true', help='Write session_report.json as compact (non-indented) JSON')
 
     args = parser.parse_args()
     if args.verbose:
         args.debug_level = 'max'
     force_audio_combination = args.fix_audio
 
-    # Build config
-    headers = {
-        'Referer': args.referer or 'https://video.ibm.com/',
-        'Origin': args.origin or 'https://video.ibm.com',
-        'User-Agent': args.user_agent or 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
-                                         '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-    }
-
-    config = {
-        'output_dir': args.output_dir,
-        'output_template': '%(uploader)s - %(title)s.%(ext)s',
-        'format_selector': f'best[ext={args.format}]/best',
-        'video_quality': args.quality,
-        'audio_quality': 'best',
-        'prefer_free_formats': True,
-        'extract_subtitles': True,
-        'auto_subtitles': True,
-        'embed_subtitles': False,
-        'download_thumbnail': True,
-        'embed_thumbnail': False,
-        'retries': 3,
-        'fragment_retries': 5,
-        'concurrent_fragments': 4,
-        'merge_output_format': args.format,
-        'keep_video': True,
-        'verbose': args.debug_level != 'none',
-        'log_level': 'DEBUG' if args.debug_level == 'max' else 'INFO',
-        # strengthened defaults:
-        'extractor_retries': 5,
-        'socket_timeout': 30,
-        'geo_bypass_country': 'US',
-        'hls_prefer_native': True,
-        'hls_use_mpegts': True,
-        # cookies / headers
-        'cookies': args.cookies,
-        'cookies_from_browser': args.cookies_from_browser,
-        'http_headers': headers,
-    }
+    config = _make_config(
+        args.output_dir, args.quality, args.format, args.debug_level, args.concurrent_fragments,
+        args.cookies, args.cookies_from_browser, args.referer, args.origin, args.user_agent,
+        args.refresh_metadata, args.compact_reports)
 
     downloader = VideoDownloader(config, debug_level=args.debug_level)
     if force_audio_combination:
         downloader.force_audio_combination = True
 
     try:
-        print(f"{'='*70}")
-        print(f"🎬 IBM Video Downloader v2.1 (Debug: {args.debug_level.upper()})")
-        print(f"{'='*70}")
-        print(f"📋 URL: {args.url}")
-        print(f"📁 Output Directory: {args.output_dir}")
-        print(f"🎯 Quality: {args.quality}")
-        print(f"📄 Container: {args.format}")
-        print(f"🔊 Force Audio Combine: {'ON' if force_audio_combination else 'OFF'}")
+        banner = [
+            SEP70,
+            f"🎬 IBM Video Downloader v2.1 (Debug: {args.debug_level.upper()})",
+            SEP70,
+            f"📋 URL: {args.url}",
+            f"📁 Output Directory: {args.output_dir}",
+            f"🎯 Quality: {args.quality}",
+            f"📄 Container: {args.format}",
+            f"🔊 Force Audio Combine: {'ON' if force_audio_combination else 'OFF'}",
+        ]
         if args.cookies:
-            print(f"🍪 Cookies file: {args.cookies}")
+            banner.append(f"🍪 Cookies file: {args.cookies}")
         if args.cookies_from_browser:
-            print(f"🍪 Cookies from browser: {args.cookies_from_browser}")
-        print(f"{'='*70}")
+            banner.append(f"🍪 Cookies from browser: {args.cookies_from_browser}")
+        banner.append(SEP70)
+        _emit(banner)
 
         if args.diagnostics:
-            print("\n🔍 RUNNING COMPREHENSIVE DIAGNOSTICS:")
-            print("="*50)
+            _emit(["\n🔍 RUNNING COMPREHENSIVE DIAGNOSTICS:", SEP50])
             diagnostics = downloader.run_diagnostic_tests(args.url)
 
-            print(f"\n📊 DIAGNOSTIC RESULTS:")
-            print(f"✅ URL Accessible: {diagnostics.get('url_accessible', False)}")
-            print(f"✅ Metadata Extraction: {diagnostics.get('metadata_extraction', False)}")
-            print(f"✅ Format Detection: {diagnostics.get('format_detection', False)}")
-            print(f"📊 Format Count: {diagnostics.get('format_count', 0)}")
-            print(f"🎯 HLS Detected: {diagnostics.get('hls_detected', False)}")
+            out = [
+                "\n📊 DIAGNOSTIC RESULTS:",
+                f"✅ URL Accessible: {diagnostics.get('url_accessible', False)}",
+                f"✅ Metadata Extraction: {diagnostics.get('metadata_extraction', False)}",
+                f"✅ Format Detection: {diagnostics.get('format_detection', False)}",
+                f"📊 Format Count: {diagnostics.get('format_count', 0)}",
+                f"🎯 HLS Detected: {diagnostics.get('hls_detected', False)}",
+            ]
             if diagnostics.get('recommended_format'):
-                print(f"🎯 Recommended Format: {diagnostics['recommended_format']}")
+                out.append(f"🎯 Recommended Format: {diagnostics['recommended_format']}")
             if diagnostics.get('test_selectors'):
-                print("\n🧪 Selector Checks (simulate):")
+                out.append("\n🧪 Selector Checks (simulate):")
                 for sel, res in diagnostics['test_selectors'].items():
                     status = "OK" if res['ok'] else f"FAIL: {res['error']}"
-                    print(f"  - {sel}: {status}")
+                    out.append(f"  - {sel}: {status}")
             if diagnostics.get('issues_found'):
-                print(f"\n⚠️  ISSUES FOUND:")
-                for issue in diagnostics['issues_found']:
-                    print(f"  - {issue}")
-            print("\n" + "="*50)
+                out.append("\n⚠️  ISSUES FOUND:")
+                out.extend(f"  - {issue}" for issue in diagnostics['issues_found'])
+            out.append("\n" + SEP50)
+            _emit(out)
             return
 
         if args.list_formats:
-            print("\n🔍 LISTING AVAILABLE FORMATS (with fallback):")
-            print("="*50)
+            _emit(["\n🔍 LISTING AVAILABLE FORMATS (with fallback):", SEP50])
             downloader.list_available_formats(args.url)
             return
 
         # Info only
         try:
-            info = downloader.get_video_info(args.url)
+            info = downloader.get_video_info(args.url, fast=args.info_only)
         except Exception as e:
             print(f"❌ Failed to extract video info: {str(e)}")
             print("🔧 Trying diagnostic fallback...")
@@ -860,43 +1241,35 @@ def main():
         downloader.save_progress_report()
 
         if success:
-            print(f"\n{'='*70}")
-            print("✅ DOWNLOAD COMPLETED SUCCESSFULLY!")
-            print(f"📁 Files saved to: {args.output_dir}")
-
-            video_files = sorted(Path(args.output_dir).glob("*.mp4")) + \
-                          sorted(Path(args.output_dir).glob("*.mkv")) + \
-                          sorted(Path(args.output_dir).glob("*.webm"))
-            if video_files:
-                video_file = video_files[-1]
-                file_size_gb = video_file.stat().st_size / (1024**3)
-                print(f"🎥 Video: {video_file.name} ({file_size_gb:.2f} GB)")
+            out = ["\n" + SEP70, "✅ DOWNLOAD COMPLETED SUCCESSFULLY!", f"📁 Files saved to: {args.output_dir}"]
+
+            # Newest video in one directory pass (the file just written)
+            best = None
+            with os.scandir(args.output_dir) as it:
+                for de in it:
+                    if de.is_file() and os.path.splitext(de.name)[1].lower() in VIDEO_EXTS:
+                        st = de.stat()
+                        if best is None or st.st_mtime > best[1]:
+                            best = (de.path, st.st_mtime, st.st_size)
+            if best:
+                video_file = Path(best[0])
+                file_size_gb = best[2] / GIB
+                out.append(f"🎥 Video: {video_file.name} ({file_size_gb:.2f} GB)")
 
                 diags = downloader.diagnostic_data or {}
                 if diags.get('hls_detected'):
                     if diags.get('video_only_count', 0) > 0 and diags.get('audio_only_count', 0) > 0:
-                        print(f"🔊 Audio Status: Video+Audio combined automatically")
+                        out.append("🔊 Audio Status: Video+Audio combined automatically")
                     elif diags.get('video_only_count', 0) > 0 and diags.get('audio_only_count', 0) == 0:
-                        print(f"⚠️  Audio Status: No audio detected (video-only HLS stream)")
+                        out.append("⚠️  Audio Status: No audio detected (video-only HLS stream)")
 
-                print(f"🎬 To play the video:")
-                print(f"   macOS: open '{video_file}'")
-                print(f"   Linux: vlc '{video_file}' or mpv '{video_file}'")
-                print(f"   Windows: start \"{video_file}\"")
-                print(f"   Universal: Use VLC or mpv")
+                out.append(PLAY_HELP.format(file=video_file))
                 if diags.get('hls_detected'):
-                    print(f"ℹ️  Note: HLS-derived files typically play best in VLC/mpv")
-            print(f"{'='*70}")
+                    out.append("ℹ️  Note: HLS-derived files typically play best in VLC/mpv")
+            out.append(SEP70)
+            _emit(out)
         else:
-            print(f"\n{'='*70}")
-            print("❌ DOWNLOAD FAILED")
-            print("🔧 Troubleshooting suggestions:")
-            print("  1) Add headers: --referer https://video.ibm.com/  --origin https://video.ibm.com")
-            print("  2) Try cookies: --cookies cookies.txt  or  --cookies-from-browser chrome")
-            print("  3) Run: --diagnostics (to see selectors and HLS audio-groups)")
-            print("  4) Use explicit selectors via --quality (e.g., 720p) or edit format logic")
-            print("  5) Check logs/network_debug.json and downloads/logs/*.log")
-            print(f"{'='*70}")
+            _emit(FAILURE_HELP)
             sys.exit(1)
 
     except KeyboardInterrupt:
@@ -908,6 +1281,8 @@ def main():
         if args.debug_level == 'none':
             print("🔧 Or use --debug-level max for detailed info.")
         sys.exit(1)
+    finally:
+        downloader.close()
 
 
 if __name__ == "__main__":
@@ -10,26 +10,49 @@ Requirements:
 """
 
 import argparse
+import functools
 import sys
-import traceback
+import time
 from pathlib import Path
+from types import MappingProxyType
+
+
+# yt-dlp is imported on first use so --help and argument errors return immediately
+@functools.lru_cache(maxsize=1)
+def _load_yt_dlp():
+    try:
+        import yt_dlp
+    except ImportError:
+        print("Error: yt-dlp not installed. Run: pip install yt-dlp")
+        sys.exit(1)
+    return yt_dlp
 
-try:
-    import yt_dlp
-except ImportError:
-    print("Error: yt-dlp not installed. Run: pip install yt-dlp")
-    sys.exit(1)
 
 # Check for ImpersonateTarget (optional, for curl_cffi support)
-try:
-    from yt_dlp.networking.impersonate import ImpersonateTarget
-    HAS_IMPERSONATE = True
-except ImportError:
-    HAS_IMPERSONATE = False
+@functools.lru_cache(maxsize=1)
+def _get_impersonate():
+    _load_yt_dlp()
+    try:
+        from yt_dlp.networking.impersonate import ImpersonateTarget
+    except ImportError:
+        return None
+    return ImpersonateTarget
+
 
+def __getattr__(name: str):
+    """Resolve the lazily imported module-level names (yt_dlp, HAS_IMPERSONATE)."""
+    if name == 'yt_dlp':
+        return _load_yt_dlp()
+    if name == 'HAS_IMPERSONATE':
+        return _get_impersonate() is not None
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+SEP60 = '=' * 60
+PROGRESS_INTERVAL = 0.1  # seconds between progress line redraws
 
 # Resolution limits based on quality and size combinations
-RESOLUTION_LIMITS = {
+_RESOLUTION_LIMITS = {
     ('low', 'low'): 360,
     ('low', 'medium'): 480,
     ('low', 'high'): 720,
@@ -40,12 +63,13 @@ RESOLUTION_LIMITS = {
     ('high', 'medium'): 1080,
     ('high', 'high'): None,  # Best available
 }
+RESOLUTION_LIMITS = MappingProxyType(_RESOLUTION_LIMITS)  # read-only view
+RESOLUTION_KEYS = tuple(_RESOLUTION_LIMITS)
 
 
-def get_format_selector(quality: str, size: str) -> str:
-    """Build format selector string based on quality and size."""
-    max_height = RESOLUTION_LIMITS.get((quality, size), 720)
-
+@functools.lru_cache(maxsize=None)
+def _build_selector(max_height) -> str:
+    """Build format selector string for a height limit (None = best available)."""
     if max_height is None:
         # Best available - with extensive fallbacks
         return 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/bestvideo+bestaudio/best[ext=mp4]/best'
@@ -62,6 +86,24 @@ def get_format_selector(quality: str, size: str) -> str:
         )
 
 
+# Selector strings for every quality/size combination, built once at import
+FORMAT_SELECTORS = {k: _build_selector(v) for k, v in RESOLUTION_LIMITS.items()}
+_DEFAULT_SELECTOR = _build_selector(720)
+
+
+def get_format_selector(quality: str, size: str) -> str:
+    """Return the format selector string for a quality and size."""
+    return FORMAT_SELECTORS.get((quality, size), _DEFAULT_SELECTOR)
+
+
+@functools.lru_cache(maxsize=32)
+def _ensure_dir(output_dir: str) -> Path:
+    """Create output_dir once per process (batch runs reuse the same directory)."""
+    path = Path(output_dir)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
 def download_video(
     video_id: str,
     quality: str = 'low',
@@ -85,10 +127,11 @@ def download_video(
         True if download succeeded, False otherwise
     """
     url = f'https://www.youtube.com/watch?v={video_id}'
-    output_path = Path(output_dir)
-    output_path.mkdir(parents=True, exist_ok=True)
+    output_path = _ensure_dir(output_dir)
 
     format_selector = get_format_selector(quality, size)
+    yt_dlp = _load_yt_dlp()
+    impersonate_target = _get_impersonate()
 
     ydl_opts = {
         'format': format_selector,
@@ -129,9 +172,9 @@ def download_video(
     }
 
     # Add impersonation if curl_cffi is available
-    if HAS_IMPERSONATE:
+    if impersonate_target is not None:
         try:
-            ydl_opts['impersonate'] = ImpersonateTarget.from_str('chrome-131:macos-14')
+            ydl_opts['impersonate'] = impersonate_target.from_str('chrome-131:macos-14')
         except Exception:
             pass  # Skip if impersonation target not available
 
@@ -139,44 +182,52 @@ def download_video(
     if use_cookies:
         ydl_opts['cookiesfrombrowser'] = ('chrome',)
 
-    print(f"{'='*60}")
-    print("YouTube Video Downloader")
-    print(f"{'='*60}")
-    print(f"Video ID: {video_id}")
-    print(f"URL: {url}")
-    print(f"Quality: {quality}")
-    print(f"Size: {size}")
-    print(f"Subtitles: {language}")
-    print(f"Output: {output_dir}")
-    print(f"Format: {format_selector}")
-    print(f"Impersonation: {'enabled' if HAS_IMPERSONATE else 'disabled'}")
-    print(f"Cookies: {'enabled' if use_cookies else 'disabled'}")
-    print(f"{'='*60}")
+    sys.stdout.write('\n'.join([
+        SEP60,
+        "YouTube Video Downloader",
+        SEP60,
+        f"Video ID: {video_id}",
+        f"URL: {url}",
+        f"Quality: {quality}",
+        f"Size: {size}",
+        f"Subtitles: {language}",
+        f"Output: {output_dir}",
+        f"Format: {format_selector}",
+        f"Impersonation: {'enabled' if impersonate_target is not None else 'disabled'}",
+        f"Cookies: {'enabled' if use_cookies else 'disabled'}",
+        SEP60,
+    ]) + '\n')
+    sys.stdout.flush()
 
     try:
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             ydl.download([url])
-        print(f"\n{'='*60}")
-        print("Download completed successfully!")
-        print(f"Files saved to: {output_dir}")
-        print(f"{'='*60}")
+        print(f"\n{SEP60}\nDownload completed successfully!\nFiles saved to: {output_dir}\n{SEP60}")
         return True
     except yt_dlp.utils.DownloadError as e:
         print(f"\nDownload error: {e}")
         return False
     except Exception as e:
+        import traceback
         print(f"\nUnexpected error: {e}")
         traceback.print_exc()
         return False
 
 
+_last_progress_t = 0.0
+
+
 def progress_hook(d: dict):
-    """Progress callback for yt-dlp."""
+    """Progress callback for yt-dlp (download line redrawn at most every PROGRESS_INTERVAL)."""
+    global _last_progress_t
     if d['status'] == 'downloading':
-        percent = d.get('_percent_str', 'N/A')
-        speed = d.get('_speed_str', 'N/A')
-        eta = d.get('_eta_str', 'N/A')
-        print(f"\rDownloading: {percent} | Speed: {speed} | ETA: {eta}", end='', flush=True)
+        now = time.monotonic()
+        if now - _last_progress_t < PROGRESS_INTERVAL:
+            return
+        _last_progress_t = now
+        sys.stdout.write('\rDownloading: %s | Speed: %s | ETA: %s' % (
+            d.get('_percent_str', 'N/A'), d.get('_speed_str', 'N/A'), d.get('_eta_str', 'N/A')))
+        sys.stdout.flush()
     elif d['status'] == 'finished':
         print(f"\nFinished downloading: {d.get('filename', 'Unknown')}")
 
@@ -197,7 +248,7 @@ def list_formats(video_id: str):
     }
 
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        with _load_yt_dlp().YoutubeDL(ydl_opts) as ydl:
             info = ydl.extract_info(url, download=False)
             formats = info.get('formats', [])
 
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for get_ibm_yt-dlt_claude45_20251006.py
+"""
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+# The script itself is loaded by the session-scoped `ibm_claude45` fixture in conftest.py
+
+# Diagnostics for a plain (non-HLS) video: generic selectors are tried in order
+SAFE_DIAGNOSTICS = {
+    'url_accessible': True,
+    'metadata_extraction': True,
+    'format_detection': True,
+    'format_count': 2,
+    'hls_detected': False,
+    'fallback_safe': True,
+    'available_formats': [],
+}
+
+
+@pytest.fixture
+def downloader(ibm_claude45, tmp_path):
+    """VideoDownloader writing into tmp_path, with diagnostics stubbed out."""
+    config = ibm_claude45.VideoDownloader.get_default_config(None)
+    config['output_dir'] = str(tmp_path)
+    dl = ibm_claude45.VideoDownloader(config, debug_level='max')
+    with patch.object(dl, 'run_diagnostic_tests', return_value=dict(SAFE_DIAGNOSTICS)), \
+            patch.object(dl, '_screen_format_options', side_effect=lambda ydl, ie, opts: opts):
+        yield dl
+
+
+def _patched_ydl(ibm_claude45, error):
+    """Patch YoutubeDL so every process_ie_result call raises `error`; returns (patcher, instance)."""
+    inst = MagicMock()
+    inst.__enter__.return_value = inst
+    inst.__exit__.return_value = False
+    inst.params = {}
+    inst.process_ie_result.side_effect = error
+    return patch.object(ibm_claude45.yt_dlp, 'YoutubeDL', return_value=inst), inst
+
+
+class TestFormatLoopErrors:
+    """ExtractorError from process_ie_result goes through the classified branch."""
+
+    @pytest.mark.parametrize("message,expected_calls", [
+        ('No video formats found', 1),  # ABORT: stop after the first option
+        ('Requested format is not available', 3),  # CONTINUE: try every option
+    ])
+    def test_extractor_error_is_classified(self, ibm_claude45, downloader, message, expected_calls):
+        error = ibm_claude45.yt_dlp.utils.ExtractorError(message, expected=True)
+        patcher, inst = _patched_ydl(ibm_claude45, error)
+        with patcher, patch.object(ibm_claude45.traceback, 'format_exc') as format_exc:
+            assert downloader.download_video('https://video.ibm.com/recorded/1') is False
+        assert inst.process_ie_result.call_count == expected_calls
+        # The generic "Unexpected error" branch (which formats a traceback) is never hit
+        format_exc.assert_not_called()
+
+
+def _fmt(format_id, vcodec, acodec):
+    """One diagnostics['available_formats'] row."""
+    return {'id': format_id, 'ext': 'mp4', 'height': 720 if vcodec != 'none' else None,
+            'vcodec': vcodec, 'acodec': acodec, 'filesize': None, 'is_hls': False}
+
+
+GENERIC_OPTIONS = ['best+bestaudio/best', 'best[ext=mp4]+bestaudio[ext=mp4]/best', 'best']
+
+
+class TestPruneFormatOptions:
+    """_prune_format_options drops merge selectors that cannot resolve."""
+
+    @pytest.mark.parametrize("formats,expected", [
+        # Only muxed streams: every merge half is dead, leaving a single 'best'
+        ([_fmt('18', 'avc1', 'mp4a')], ['best']),
+        # An audio-only stream exists: merges can resolve, keep everything
+        ([_fmt('137', 'avc1', 'none'), _fmt('140', 'none', 'mp4a')], GENERIC_OPTIONS),
+        # Codecs unknown: nothing can be ruled out
+        ([_fmt('0', 'unknown', 'unknown')], GENERIC_OPTIONS),
+        ([], GENERIC_OPTIONS),
+    ], ids=['no_audio_only', 'audio_only_present', 'unknown_codecs', 'no_formats'])
+    def test_prune(self, ibm_claude45, tmp_path, formats, expected):
+        config = ibm_claude45.VideoDownloader.get_default_config(None)
+        config['output_dir'] = str(tmp_path)
+        dl = ibm_claude45.VideoDownloader(config, debug_level='none')
+        assert dl._prune_format_options(list(GENERIC_OPTIONS), {'available_formats': formats}) == expected
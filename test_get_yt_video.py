@@ -4,243 +4,226 @@ Tests for get_yt-video-by-id.py
 """
 
 import pytest
+import re
+import socket
 import sys
-import tempfile
 import os
-from pathlib import Path
-from unittest.mock import patch, MagicMock
+from functools import lru_cache
+from unittest.mock import create_autospec, patch
 
 # Import the module under test
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from importlib import import_module
+_MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+if _MODULE_DIR not in sys.path:
+    sys.path.insert(0, _MODULE_DIR)
 
-# Import functions from the script (handling hyphen in filename)
-import importlib.util
-spec = importlib.util.spec_from_file_location("yt_video", "get_yt-video-by-id.py")
-yt_video = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(yt_video)
+# The script itself is loaded by the session-scoped `yt_video` fixture in conftest.py
 
-get_format_selector = yt_video.get_format_selector
-RESOLUTION_LIMITS = yt_video.RESOLUTION_LIMITS
-download_video = yt_video.download_video
 
+@lru_cache(maxsize=1)
+def _network_ok() -> bool:
+    """One short TCP connect instead of a full yt-dlp negotiation when offline."""
+    try:
+        with socket.create_connection(("www.youtube.com", 443), timeout=1.5):
+            return True
+    except OSError:
+        return False
 
-class TestResolutionLimits:
-    """Test that RESOLUTION_LIMITS has correct values."""
-
-    def test_all_quality_size_combinations_exist(self):
-        """All 9 quality/size combinations should be defined."""
-        qualities = ['low', 'medium', 'high']
-        sizes = ['low', 'medium', 'high']
-
-        for q in qualities:
-            for s in sizes:
-                assert (q, s) in RESOLUTION_LIMITS, f"Missing ({q}, {s})"
 
-    def test_low_quality_low_size(self):
-        assert RESOLUTION_LIMITS[('low', 'low')] == 360
+# Every --quality/--size pair the CLI accepts (known at collection time, for parametrize)
+LEVELS = ('low', 'medium', 'high')
+COMBINATIONS = [(q, s) for q in LEVELS for s in LEVELS]
 
-    def test_low_quality_medium_size(self):
-        assert RESOLUTION_LIMITS[('low', 'medium')] == 480
+# Substrings a selector must contain (checked in one pass; failures list what's missing)
+REQUIRED_LOW = ('360', 'bestvideo', 'bestaudio', 'ext=mp4')
+REQUIRED_BEST = ('ext=mp4', 'best')
+_HEIGHT_RE = re.compile(r'height<=')
+_MP4_RE = re.compile(r'ext=mp4')
 
-    def test_low_quality_high_size(self):
-        assert RESOLUTION_LIMITS[('low', 'high')] == 720
 
-    def test_medium_quality_low_size(self):
-        assert RESOLUTION_LIMITS[('medium', 'low')] == 480
-
-    def test_medium_quality_medium_size(self):
-        assert RESOLUTION_LIMITS[('medium', 'medium')] == 720
-
-    def test_medium_quality_high_size(self):
-        assert RESOLUTION_LIMITS[('medium', 'high')] == 1080
-
-    def test_high_quality_low_size(self):
-        assert RESOLUTION_LIMITS[('high', 'low')] == 720
-
-    def test_high_quality_medium_size(self):
-        assert RESOLUTION_LIMITS[('high', 'medium')] == 1080
+class TestResolutionLimits:
+    """Test that RESOLUTION_LIMITS has correct values."""
 
-    def test_high_quality_high_size_is_best(self):
-        """high/high should be None (best available)."""
-        assert RESOLUTION_LIMITS[('high', 'high')] is None
+    def test_all_quality_size_combinations_exist(self, yt_video):
+        """All 9 quality/size combinations should be defined."""
+        for q, s in COMBINATIONS:
+            assert (q, s) in yt_video.RESOLUTION_LIMITS, f"Missing ({q}, {s})"
+        assert sorted(yt_video.RESOLUTION_KEYS) == sorted(COMBINATIONS)
+
+    def test_resolution_limits_read_only(self, yt_video):
+        """RESOLUTION_LIMITS is a read-only view, so the precomputed selectors can't go stale."""
+        with pytest.raises(TypeError):
+            yt_video.RESOLUTION_LIMITS[('low', 'low')] = 1080
+
+    @pytest.mark.parametrize("quality,size,expected", [
+        ('low', 'low', 360),
+        ('low', 'medium', 480),
+        ('low', 'high', 720),
+        ('medium', 'low', 480),
+        ('medium', 'medium', 720),
+        ('medium', 'high', 1080),
+        ('high', 'low', 720),
+        ('high', 'medium', 1080),
+        ('high', 'high', None),  # best available
+    ])
+    def test_resolution_limit(self, yt_video, quality, size, expected):
+        assert yt_video.RESOLUTION_LIMITS[(quality, size)] == expected
 
 
 class TestFormatSelector:
     """Test format selector string generation."""
 
-    def test_low_low_format_selector(self):
+    def test_low_low_format_selector(self, yt_video):
         """Low/low should limit to 360p."""
-        selector = get_format_selector('low', 'low')
-        assert '360' in selector
-        assert 'bestvideo' in selector
-        assert 'bestaudio' in selector
+        selector = yt_video.get_format_selector('low', 'low')
+        assert [tok for tok in REQUIRED_LOW if tok not in selector] == []
 
-    def test_medium_medium_format_selector(self):
+    def test_medium_medium_format_selector(self, yt_video):
         """Medium/medium should limit to 720p."""
-        selector = get_format_selector('medium', 'medium')
+        selector = yt_video.get_format_selector('medium', 'medium')
         assert '720' in selector
 
-    def test_high_high_format_selector(self):
+    def test_high_high_format_selector(self, yt_video):
         """High/high should not have height limit."""
-        selector = get_format_selector('high', 'high')
+        selector = yt_video.get_format_selector('high', 'high')
         # Should not contain specific height limits
-        assert 'height<=' not in selector
-        # Should prefer mp4
-        assert 'ext=mp4' in selector
-        # Should have fallbacks
-        assert 'best' in selector
+        assert _HEIGHT_RE.search(selector) is None
+        # Should prefer mp4 and have fallbacks
+        assert [tok for tok in REQUIRED_BEST if tok not in selector] == []
 
-    def test_format_selector_has_fallbacks(self):
+    @pytest.mark.parametrize("quality,size", COMBINATIONS)
+    def test_format_selector_has_fallbacks(self, yt_video, quality, size):
         """All selectors should have multiple fallback options."""
-        for (q, s) in RESOLUTION_LIMITS.keys():
-            selector = get_format_selector(q, s)
-            # Should have multiple fallback options separated by /
-            assert selector.count('/') >= 1, f"({q}, {s}) should have fallbacks"
+        selector = yt_video.get_format_selector(quality, size)
+        # Should have multiple fallback options separated by /
+        assert selector.count('/') >= 1
 
-    def test_format_selector_prefers_mp4(self):
+    def test_format_selector_prefers_mp4(self, yt_video):
         """Format selectors should prefer mp4 format."""
-        selector = get_format_selector('low', 'low')
-        assert 'ext=mp4' in selector
+        selector = yt_video.get_format_selector('low', 'low')
+        assert _MP4_RE.search(selector) is not None
 
-    def test_format_selector_includes_audio(self):
+    def test_format_selector_includes_audio(self, yt_video):
         """Format selectors should include audio."""
-        selector = get_format_selector('low', 'low')
+        selector = yt_video.get_format_selector('low', 'low')
         assert 'bestaudio' in selector or 'best' in selector
 
+    def test_format_selectors_precomputed(self, yt_video):
+        """Every quality/size combination should have a precomputed selector."""
+        assert set(yt_video.FORMAT_SELECTORS) == set(yt_video.RESOLUTION_KEYS)
+        assert yt_video.get_format_selector('nope', 'nope') == yt_video.get_format_selector('medium', 'medium')
+
+
+def _wire_ydl(mock_ydl):
+    """Make `with mock_ydl(...) as ydl` yield the instance mock; returns it."""
+    inst = mock_ydl.return_value
+    inst.__enter__.return_value = inst
+    inst.__exit__.return_value = False
+    return inst
+
+
+@pytest.fixture(scope="session")
+def ydl_spec(yt_video):
+    """Autospec of YoutubeDL; introspecting the class once per session is the expensive part."""
+    return create_autospec(yt_video.yt_dlp.YoutubeDL)
+
+
+@pytest.fixture
+def mock_ydl(request, yt_video, ydl_spec):
+    """Patched YoutubeDL class and the instance its context manager yields.
+
+    Indirect param 'download_error' makes ydl.download() raise DownloadError.
+    """
+    # autospec: calls are checked against the real YoutubeDL signatures
+    ydl_spec.reset_mock(side_effect=True)
+    mock_instance = _wire_ydl(ydl_spec)
+    if getattr(request, 'param', None) == 'download_error':
+        mock_instance.download.side_effect = yt_video.yt_dlp.utils.DownloadError('Test error')
+    with patch.object(yt_video.yt_dlp, 'YoutubeDL', ydl_spec):
+        yield ydl_spec, mock_instance
+
 
 class TestDownloadVideoFunction:
     """Test download_video function (without actual downloading)."""
 
-    def test_download_video_creates_output_dir(self):
+    def test_download_video_creates_output_dir(self, yt_video, tmp_path, mock_ydl):
         """download_video should create output directory if it doesn't exist."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            output_dir = os.path.join(tmpdir, 'new_dir', 'nested')
-
-            # Mock YoutubeDL to avoid actual download
-            with patch.object(yt_video.yt_dlp, 'YoutubeDL') as mock_ydl:
-                mock_instance = MagicMock()
-                mock_ydl.return_value.__enter__ = MagicMock(return_value=mock_instance)
-                mock_ydl.return_value.__exit__ = MagicMock(return_value=False)
-
-                download_video(
-                    video_id='test123',
-                    output_dir=output_dir
-                )
-
-            # Directory should be created
-            assert os.path.exists(output_dir)
-
-    def test_download_video_builds_correct_url(self):
-        """download_video should build correct YouTube URL from video ID."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            with patch.object(yt_video.yt_dlp, 'YoutubeDL') as mock_ydl:
-                mock_instance = MagicMock()
-                mock_ydl.return_value.__enter__ = MagicMock(return_value=mock_instance)
-                mock_ydl.return_value.__exit__ = MagicMock(return_value=False)
-
-                download_video(
-                    video_id='abc123xyz',
-                    output_dir=tmpdir
-                )
-
-                # Check that download was called with correct URL
-                mock_instance.download.assert_called_once()
-                args = mock_instance.download.call_args[0][0]
-                assert 'https://www.youtube.com/watch?v=abc123xyz' in args
-
-    def test_download_video_uses_correct_format_selector(self):
-        """download_video should use format selector based on quality/size."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            with patch.object(yt_video.yt_dlp, 'YoutubeDL') as mock_ydl:
-                mock_instance = MagicMock()
-                mock_ydl.return_value.__enter__ = MagicMock(return_value=mock_instance)
-                mock_ydl.return_value.__exit__ = MagicMock(return_value=False)
-
-                download_video(
-                    video_id='test',
-                    quality='medium',
-                    size='high',
-                    output_dir=tmpdir
-                )
-
-                # Check the format option passed to YoutubeDL
-                call_args = mock_ydl.call_args[0][0]
-                assert '1080' in call_args['format']
-
-    def test_download_video_returns_true_on_success(self):
-        """download_video should return True on successful download."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            with patch.object(yt_video.yt_dlp, 'YoutubeDL') as mock_ydl:
-                mock_instance = MagicMock()
-                mock_ydl.return_value.__enter__ = MagicMock(return_value=mock_instance)
-                mock_ydl.return_value.__exit__ = MagicMock(return_value=False)
-
-                result = download_video(
-                    video_id='test',
-                    output_dir=tmpdir
-                )
-
-                assert result is True
-
-    def test_download_video_returns_false_on_error(self):
-        """download_video should return False on download error."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            with patch.object(yt_video.yt_dlp, 'YoutubeDL') as mock_ydl:
-                mock_instance = MagicMock()
-                mock_instance.download.side_effect = yt_video.yt_dlp.utils.DownloadError('Test error')
-                mock_ydl.return_value.__enter__ = MagicMock(return_value=mock_instance)
-                mock_ydl.return_value.__exit__ = MagicMock(return_value=False)
-
-                result = download_video(
-                    video_id='test',
-                    output_dir=tmpdir
-                )
-
-                assert result is False
-
-    def test_download_video_sets_subtitle_language(self):
-        """download_video should set subtitle language in options."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            with patch.object(yt_video.yt_dlp, 'YoutubeDL') as mock_ydl:
-                mock_instance = MagicMock()
-                mock_ydl.return_value.__enter__ = MagicMock(return_value=mock_instance)
-                mock_ydl.return_value.__exit__ = MagicMock(return_value=False)
-
-                download_video(
-                    video_id='test',
-                    language='es',
-                    output_dir=tmpdir
-                )
-
-                call_args = mock_ydl.call_args[0][0]
-                assert 'es' in call_args['subtitleslangs']
+        output_dir = tmp_path / 'new_dir' / 'nested'
+
+        yt_video.download_video(
+            video_id='test123',
+            output_dir=str(output_dir)
+        )
+
+        # Directory should be created
+        assert output_dir.is_dir()
+
+    # (mock_ydl param, download_video kwargs, check(mock_cls, mock_instance, result))
+    @pytest.mark.parametrize("mock_ydl,kwargs,check", [
+        # Builds the watch URL from the video ID and downloads it once
+        (None, {'video_id': 'abc123xyz'},
+         lambda cls, inst, ok: [c.args[0] for c in inst.download.call_args_list]
+         == [['https://www.youtube.com/watch?v=abc123xyz']]),
+        # Format selector follows quality/size
+        (None, {'video_id': 'test', 'quality': 'medium', 'size': 'high'},
+         lambda cls, inst, ok: '1080' in cls.call_args[0][0]['format']),
+        # Subtitle language is passed through
+        (None, {'video_id': 'test', 'language': 'es'},
+         lambda cls, inst, ok: 'es' in cls.call_args[0][0]['subtitleslangs']),
+        # True on success, False on DownloadError
+        (None, {'video_id': 'test'}, lambda cls, inst, ok: ok is True),
+        ('download_error', {'video_id': 'test'}, lambda cls, inst, ok: ok is False),
+    ], indirect=['mock_ydl'], ids=[
+        'builds_correct_url', 'uses_correct_format_selector', 'sets_subtitle_language',
+        'returns_true_on_success', 'returns_false_on_error',
+    ])
+    def test_download_video(self, yt_video, tmp_path, mock_ydl, kwargs, check):
+        """download_video should pass the right options to YoutubeDL and report the outcome."""
+        mock_cls, mock_instance = mock_ydl
+        result = yt_video.download_video(output_dir=str(tmp_path), **kwargs)
+        assert check(mock_cls, mock_instance, result)
+
+
+class TestProgressHook:
+    """Test the console progress callback."""
+
+    def test_progress_hook_throttles_downloading_updates(self, yt_video, capsys):
+        """Rapid 'downloading' callbacks should redraw the line only once per interval."""
+        yt_video._last_progress_t = 0.0
+        for i in range(50):
+            yt_video.progress_hook({'status': 'downloading', '_percent_str': f'{i}%'})
+        out = capsys.readouterr().out
+        assert out.count('\rDownloading:') == 1
+
+    def test_progress_hook_reports_finished(self, yt_video, capsys):
+        """'finished' callbacks are never throttled."""
+        yt_video.progress_hook({'status': 'finished', 'filename': 'video.mp4'})
+        assert 'Finished downloading: video.mp4' in capsys.readouterr().out
 
 
 class TestIntegration:
     """Integration tests (require network, run with --run-integration)."""
 
     @pytest.mark.integration
-    def test_real_download_short_video(self):
+    @pytest.mark.skipif(not _network_ok(), reason="offline: www.youtube.com:443 unreachable")
+    def test_real_download_short_video(self, yt_video, tmp_path):
         """Test downloading a real short video."""
-        with tempfile.TemporaryDirectory() as tmpdir:
-            # Use a very short public domain video
-            result = download_video(
-                video_id='L7gv9aGB7VY',  # Default test video
-                quality='low',
-                size='low',
-                output_dir=tmpdir
-            )
-
-            assert result is True
-
-            # Check that files were created
-            files = list(Path(tmpdir).glob('*'))
-            assert len(files) > 0
-
-            # Should have at least a video file
-            video_files = list(Path(tmpdir).glob('*.mp4'))
-            assert len(video_files) >= 1
+        # Use a very short public domain video
+        result = yt_video.download_video(
+            video_id='L7gv9aGB7VY',  # Default test video
+            quality='low',
+            size='low',
+            output_dir=str(tmp_path)
+        )
+
+        assert result is True
+
+        # Check that files were created
+        files = list(tmp_path.glob('*'))
+        assert len(files) > 0
+
+        # Should have at least a video file
+        video_files = list(tmp_path.glob('*.mp4'))
+        assert len(video_files) >= 1
 
 
 if __name__ == '__main__':